@@ -1,24 +1,74 @@
 import streamlit as st
-import openai
-from langchain.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.prompts import PromptTemplate
-from langchain.schema.runnable import RunnablePassthrough
-from langchain.chat_models import ChatOpenAI
+from streamlit import runtime
 from config import AI_CONFIG
-import base64
+from document_editor import split_sections, join_sections, section_title, select_sections, build_context, parse_section_edits, apply_section_edits, section_diff
+from rag_service import QA_TEMPLATE, GENERATION_TEMPLATE, format_documents, stream_answer, summarize_conversation
+from chat_memory import ConversationMemory
+from vector_store import document_hash, save_pdf, start_ingestion, get_ingestion_job
 import asyncio
 
+MEMORY_TURNS = AI_CONFIG["openai"].get("memory_turns", 6)
+
+def display_conversation(memory):
+    # 요약으로 접힌 이전 대화는 펼쳤을 때만 보여준다
+    if memory.summary:
+        with st.expander(f"이전 대화 {memory.folded_count}개 요약"):
+            st.write(memory.summary)
+    for msg in memory.messages():
+        st.chat_message(msg["role"]).write(msg["content"])
+
+@st.cache_resource(max_entries=16)
+def load_pdf_bytes(file_path):
+    # 저장된 PDF는 내용 해시로 이름이 정해져 바뀌지 않으므로 업로드당 한 번만 디스크에서 읽는다
+    with open(file_path, "rb") as file:
+        return file.read()
+
+def pdf_viewer_url(file_path, doc_hash):
+    # PDF를 base64로 HTML에 싣지 않고 Streamlit 미디어 엔드포인트(Range 요청 지원)에서 제공한다
+    # 스크립트가 실행될 때마다(프래그먼트만 다시 실행될 때도) 세션의 미디어 참조가 지워지므로 실행마다 다시 등록한다
+    url = runtime.get_instance().media_file_mgr.add(load_pdf_bytes(file_path), "application/pdf", f"pdf_viewer.{doc_hash}")
+    return url.lstrip("/")
+
+def render_ingestion_status(job):
+    if job is None or job.status == "done":
+        st.success("PDF 파일이 성공적으로 처리되었습니다!")
+    elif job.status == "failed":
+        st.error(f"PDF 처리 중 오류가 발생했습니다: {job.error}")
+    else:
+        st.progress(job.progress, text=f"PDF 처리 중... {job.pages_read}/{job.total_pages} 페이지, {job.chunks_indexed}개 청크 색인 완료 (색인된 부분부터 질문할 수 있습니다)")
+
+@st.experimental_fragment(run_every=1)
+def poll_ingestion_progress(doc_hash):
+    job = get_ingestion_job(doc_hash)
+    if job is None or job.status != "running":
+        # 작업이 끝나면 앱 전체를 한 번 다시 실행해 폴링하지 않는 표시로 바꾼다
+        st.rerun()
+    if st.session_state.pdf_file:
+        # 프래그먼트 실행에서도 보고 있는 PDF의 참조를 유지해야 뷰어 URL이 404가 되지 않는다
+        pdf_viewer_url(st.session_state.pdf_file, doc_hash)
+    render_ingestion_status(job)
+
+def display_ingestion_progress(doc_hash):
+    job = get_ingestion_job(doc_hash)
+    if job is not None and job.status == "running":
+        poll_ingestion_progress(doc_hash)
+    else:
+        render_ingestion_status(job)
+
 def ai_service():
     # Initialize session state
     if "retriever" not in st.session_state:
         st.session_state.retriever = None
     if "pdf_file" not in st.session_state:
         st.session_state.pdf_file = None
-    if "messages" not in st.session_state:
-        st.session_state["messages"] = [{"role": "assistant", "content": "PDF 파일을 업로드하고 질문을 입력해주세요."}]
+    if "pdf_hash" not in st.session_state:
+        st.session_state.pdf_hash = None
+    if "conversations" not in st.session_state:
+        # 모드별로 대화를 따로 보관한다
+        st.session_state.conversations = {
+            "qa": ConversationMemory("PDF 파일을 업로드하고 질문을 입력해주세요.", MEMORY_TURNS),
+            "generation": ConversationMemory("수정하고 싶은 내용을 입력해주세요.", MEMORY_TURNS),
+        }
     if "ai_service_option" not in st.session_state:
         st.session_state.ai_service_option = False
     if "markdown_document" not in st.session_state:
@@ -38,11 +88,21 @@ def ai_service():
 
         if st.session_state.markdown_document:
             col1, col2 = st.columns([2, 3])
+            sections = split_sections(st.session_state.markdown_document)
+
+            with col2:
+                st.header("📄 PDF Viewer")
+                # 답변이 스트리밍되는 동안 미리보기도 함께 갱신한다
+                preview = st.empty()
+                preview.markdown(st.session_state.markdown_document)
 
             with col1:
                 st.header("💬 Chatbot")
-                for msg in st.session_state.messages:
-                    st.chat_message(msg["role"]).write(msg["content"])
+                memory = st.session_state.conversations["generation"]
+                display_conversation(memory)
+
+                section_options = ["자동 선택"] + [f"{index}. {section_title(section, index)}" for index, section in enumerate(sections)]
+                target_section = st.selectbox("수정할 섹션", section_options, key="edit_section")
 
                 if prompt := st.chat_input("질문을 입력하세요..."):
                     openai_api_key = AI_CONFIG["openai"]["api_key"]
@@ -50,43 +110,43 @@ def ai_service():
                         st.info("Please add your OpenAI API key to continue.")
                         st.stop()
 
-                    st.session_state.messages.append({"role": "user", "content": prompt})
+                    memory.append("user", prompt)
                     st.chat_message("user").write(prompt)
 
-                    # LLM 설정
-                    llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0, openai_api_key=openai_api_key)
-                    # 프롬프트 템플릿 설정
-                    template = """사용자의 요청 사항에 따라 아래 문서를 수정하시오.
-                    오직 수정된 문서 결과만 output으로 제공하시오.
-                    {context}
-                    질문: {question}
-                    수정된 문서:"""
-                    rag_prompt_custom = PromptTemplate.from_template(template)
-
-                    # RAG chain 설정
-                    rag_chain = {"context": RunnablePassthrough(lambda: st.session_state.markdown_document), "question": RunnablePassthrough()} | rag_prompt_custom | llm
-                    response = rag_chain.invoke(f'{prompt}')
-                    msg = response.content
-
-                    st.session_state.messages.append({"role": "assistant", "content": msg})
-                    st.chat_message("assistant").write(msg)
+                    # 문서 전체 대신 관련 섹션만 보내고, 돌려받은 섹션만 교체한다
+                    if target_section == "자동 선택":
+                        selected = select_sections(sections, prompt)
+                    else:
+                        selected = [section_options.index(target_section) - 1]
+                    context = build_context(sections, selected)
+
+                    msg = ""
+                    with st.chat_message("assistant"):
+                        answer = st.empty()
+                        for token in stream_answer(GENERATION_TEMPLATE, context, prompt, memory.history()):
+                            msg += token
+                            answer.markdown(msg)
+                            if "\n" in token:
+                                preview.markdown(join_sections(apply_section_edits(sections, parse_section_edits(msg, selected))))
+
+                        edits = parse_section_edits(msg, selected)
+                        diff = section_diff(sections, edits)
+                        if diff:
+                            with st.expander("변경 내용"):
+                                st.code(diff, language="diff")
+
+                    memory.append("assistant", msg)
+                    if memory.needs_fold():
+                        memory.fold(summarize_conversation)
 
                     # Update markdown document based on chatbot response
-                    st.session_state.markdown_document = msg
+                    st.session_state.markdown_document = join_sections(apply_section_edits(sections, edits))
 
             with col2:
-                st.header("📄 PDF Viewer")
                 markdown_document = st.session_state.markdown_document
 
-                st.markdown(markdown_document)
+                preview.markdown(markdown_document)
                 st.download_button("Download Updated Markdown", markdown_document, file_name="updated_output.md")
-
-                with open("updated_output.md", "wb") as f:
-                    f.write(markdown_document.encode('utf-8'))
-                with open("updated_output.md", "rb") as f:
-                    base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-                pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}#toolbar=0&navpanes=0&scrollbar=0" width="100%" height="500" type="application/pdf"></iframe>'
-                st.markdown(pdf_display, unsafe_allow_html=True)
     else:
         col1, col2 = st.columns([3, 2])
 
@@ -96,49 +156,31 @@ def ai_service():
             process = st.button("PDF 처리하기")
 
             if process and uploaded_file:
-                openai_api_key = AI_CONFIG["openai"]["api_key"]
-                openai.api_key = openai_api_key
-
-                # Save the uploaded file
-                file_name = uploaded_file.name
-                with open(file_name, "wb") as file:
-                    file.write(uploaded_file.getvalue())
+                # 업로드한 파일은 내용 해시로 저장하고, 이미 색인된 문서면 기존 벡터를 재사용한다
+                data = uploaded_file.getvalue()
+                doc_hash = document_hash(data)
+                file_name = save_pdf(data, doc_hash)
 
                 # Store the file name in session state
                 st.session_state.pdf_file = file_name
 
-                # Load and split PDF
-                loader = PyPDFLoader(file_name)
-                pages = loader.load_and_split()
-
-                # Split text into chunks
-                text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=0)
-                splits = text_splitter.split_documents(pages)
-
-                # Set embedding model
-                embedding_model = OpenAIEmbeddings(openai_api_key=openai_api_key)
+                vectorstore = start_ingestion(file_name, doc_hash)
+                st.session_state.retriever = vectorstore.as_retriever()
+                st.session_state.pdf_hash = doc_hash
 
-                # Set up ChromaDB and retriever
-                vectorstore = Chroma.from_documents(documents=splits, embedding=embedding_model)
-                vectorstore_retriever = vectorstore.as_retriever()
-
-                st.session_state.retriever = vectorstore_retriever
-                st.success("PDF 파일이 성공적으로 처리되었습니다!")
+            if st.session_state.pdf_hash:
+                display_ingestion_progress(st.session_state.pdf_hash)
 
         # Display the PDF viewer if a file has been processed
         if st.session_state.pdf_file:
-            with open(st.session_state.pdf_file, "rb") as f:
-                base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-            pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}#toolbar=0&navpanes=0&scrollbar=0" width="100%" height="500" type="application/pdf"></iframe>'
+            pdf_url = pdf_viewer_url(st.session_state.pdf_file, st.session_state.pdf_hash)
+            pdf_display = f'<iframe src="{pdf_url}#toolbar=0&navpanes=0&scrollbar=0" width="100%" height="500" type="application/pdf"></iframe>'
             col1.markdown(pdf_display, unsafe_allow_html=True)
 
         with col2:
             st.header("💬 Chatbot")
-            if "messages" not in st.session_state:
-                st.session_state["messages"] = [{"role": "assistant", "content": "PDF 파일을 업로드하고 질문을 입력해주세요."}]
-
-            for msg in st.session_state.messages:
-                st.chat_message(msg["role"]).write(msg["content"])
+            memory = st.session_state.conversations["qa"]
+            display_conversation(memory)
 
             if prompt := st.chat_input("질문을 입력하세요..."):
                 openai_api_key = AI_CONFIG["openai"]["api_key"]
@@ -146,24 +188,15 @@ def ai_service():
                     st.info("Please add your OpenAI API key to continue.")
                     st.stop()
 
-                st.session_state.messages.append({"role": "user", "content": prompt})
+                memory.append("user", prompt)
                 st.chat_message("user").write(prompt)
 
-                # LLM 설정
-                llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0, openai_api_key=openai_api_key)
-                # 프롬프트 템플릿 설정
-                template = """다음과 같은 맥락을 사용하여 마지막 질문에 대답하십시오.
-                만약 답을 모르면 모른다고만 말하고 답을 지어내려고 하지 마십시오.
-                답변은 최대 세 문장으로 하고 가능한 한 간결하게 유지하십시오.
-                항상 '질문해주셔서 감사합니다!'라고 답변 끝에 말하십시오.
-                {context}
-                질문: {question}
-                도움이 되는 답변:"""
-                rag_prompt_custom = PromptTemplate.from_template(template)
-
-                # RAG chain 설정
-                rag_chain = {"context": st.session_state.retriever, "question": RunnablePassthrough()} | rag_prompt_custom | llm
-                response = rag_chain.invoke(f'{prompt}')
-                msg = response.content
-                st.session_state.messages.append({"role": "assistant", "content": msg})
-                st.chat_message("assistant").write(msg)
\ No newline at end of file
+                if st.session_state.retriever is None:
+                    st.info("PDF 파일을 먼저 처리해주세요.")
+                    st.stop()
+
+                context = format_documents(st.session_state.retriever.invoke(prompt))
+                msg = st.chat_message("assistant").write_stream(stream_answer(QA_TEMPLATE, context, prompt, memory.history()))
+                memory.append("assistant", msg)
+                if memory.needs_fold():
+                    memory.fold(summarize_conversation)
\ No newline at end of file
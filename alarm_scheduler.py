@@ -0,0 +1,141 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from mysql_connector_pool import MysqlConnectorPool
+from mailing_service import send_message_to_queue
+
+DEFAULT_ALARM_HOUR = 9
+DEFAULT_ALARM_MINUTE = 0
+DEFAULT_CRAWLING_OPTION = "Most Recent"
+
+
+class AlarmScheduler:
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls, *args, **kwargs):
+        if cls.__instance is None:
+            with cls.__instance_lock:
+                if cls.__instance is None:
+                    cls.__instance = cls(*args, **kwargs)
+        return cls.__instance
+
+    def __init__(self, poll_interval=60, spread_seconds=600, website="pubmed"):
+        self.mysql = MysqlConnectorPool.instance()
+        self.poll_interval = poll_interval
+        self.spread_seconds = spread_seconds
+        self.website = website
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="alarm-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due(datetime.now())
+            except Exception as e:
+                print(f"Alarm scheduler error: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def fetch_schedules(self):
+        # (키워드, 옵션, 회원)마다 한 행을 읽어 (키워드, 옵션) 단위로 묶는다
+        # GROUP_CONCAT은 group_concat_max_len(기본 1024바이트)에서 잘리므로 묶는 일은 Python에서 한다
+        query = """
+            SELECT
+                sk.search_keyword,
+                COALESCE(sk.crawling_option, %s) AS crawling_option,
+                sk.member_no,
+                COALESCE(sk.alarm_hour, %s) * 60 + COALESCE(sk.alarm_minute, %s) AS alarm_minutes,
+                kr.last_run_at
+            FROM tb_search_keyword sk
+            LEFT JOIN tb_keyword_crawl_run kr
+                ON kr.search_keyword = sk.search_keyword
+                AND kr.crawling_option = COALESCE(sk.crawling_option, %s)
+            WHERE sk.alarm_yn = 'Y'
+            ORDER BY sk.search_keyword, crawling_option, sk.member_no
+        """
+        params = (DEFAULT_CRAWLING_OPTION, DEFAULT_ALARM_HOUR, DEFAULT_ALARM_MINUTE, DEFAULT_CRAWLING_OPTION)
+        schedules = {}
+        for row in self.mysql.read(query, params) or []:
+            key = (row["search_keyword"], row["crawling_option"])
+            schedule = schedules.get(key)
+            if schedule is None:
+                schedule = schedules[key] = {
+                    "search_keyword": row["search_keyword"],
+                    "crawling_option": row["crawling_option"],
+                    "member_nos": [],
+                    "alarm_minutes": row["alarm_minutes"],
+                    "last_run_at": row["last_run_at"],
+                }
+            schedule["member_nos"].append(row["member_no"])
+            # 묶인 회원 중 가장 이른 알림 시각에 실행한다
+            schedule["alarm_minutes"] = min(schedule["alarm_minutes"], row["alarm_minutes"])
+        return list(schedules.values())
+
+    def spread_offset(self, search_keyword):
+        # 같은 시각에 몰리지 않도록 키워드마다 고정된 지연을 준다
+        digest = hashlib.sha1(search_keyword.encode("utf-8")).hexdigest()
+        return timedelta(seconds=int(digest, 16) % self.spread_seconds) if self.spread_seconds else timedelta()
+
+    def scheduled_at(self, schedule, now):
+        # 알림 시각 + 분산 지연이 자정을 넘기면 하루로 나눈 나머지를 쓰고, 아직 오지 않았으면 전날 예정 시각을 돌려준다
+        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        offset = timedelta(minutes=int(schedule["alarm_minutes"])) + self.spread_offset(schedule["search_keyword"])
+        scheduled_at = start_of_day + timedelta(seconds=offset.total_seconds() % (24 * 60 * 60))
+        if scheduled_at > now:
+            scheduled_at -= timedelta(days=1)
+        return scheduled_at
+
+    def is_due(self, schedule, now):
+        scheduled_at = self.scheduled_at(schedule, now)
+        last_run_at = schedule["last_run_at"]
+        if last_run_at is None:
+            # 처음 실행하는 키워드는 오늘 예정 시각이 지났을 때만 보낸다
+            return scheduled_at.date() == now.date()
+        return last_run_at < scheduled_at
+
+    def run_due(self, now):
+        dispatched = []
+        for schedule in self.fetch_schedules():
+            if not self.is_due(schedule, now):
+                continue
+            if not self.claim_run(schedule, self.scheduled_at(schedule, now), now):
+                # 다른 프로세스(앱 복제본이나 사이드카)가 이미 이 슬롯을 가져갔다
+                continue
+            # 크롤러 API는 회원 한 명씩 받으므로 묶인 회원마다 요청을 보낸다
+            for member_no in schedule["member_nos"]:
+                send_message_to_queue(schedule["search_keyword"], schedule["crawling_option"], self.website, member_no)
+            dispatched.append(schedule["search_keyword"])
+        return dispatched
+
+    def claim_run(self, schedule, scheduled_at, run_at):
+        # 실행 기록을 조건부로 갱신해 같은 슬롯은 프로세스가 여럿이어도 한 곳에서만 보낸다
+        key = (schedule["search_keyword"], schedule["crawling_option"])
+        insert_query = """
+            INSERT IGNORE INTO tb_keyword_crawl_run (search_keyword, crawling_option, last_run_at)
+            VALUES (%s, %s, %s)
+        """
+        if self.mysql.write(insert_query, (*key, run_at)) == 1:
+            return True
+        update_query = """
+            UPDATE tb_keyword_crawl_run
+            SET last_run_at = %s
+            WHERE search_keyword = %s AND crawling_option = %s AND last_run_at < %s
+        """
+        return self.mysql.write(update_query, (run_at, *key, scheduled_at)) == 1
+
+
+if __name__ == "__main__":
+    # Streamlit 앱과 별도로 실행하는 사이드카 모드
+    scheduler = AlarmScheduler.instance()
+    scheduler.start()
+    scheduler._thread.join()
@@ -0,0 +1,40 @@
+class ConversationMemory:
+    # 최근 max_turns 턴만 원문으로 보관하고, 그 이전 대화는 요약 한 덩어리로 접어 둔다
+    def __init__(self, greeting, max_turns=6):
+        self.greeting = greeting
+        self.max_turns = max_turns
+        self.summary = ""
+        self.recent = []
+        self.folded_count = 0
+
+    def append(self, role, content):
+        self.recent.append({"role": role, "content": content})
+
+    def messages(self):
+        return [{"role": "assistant", "content": self.greeting}] + self.recent
+
+    def needs_fold(self):
+        return len(self.recent) > 2 * self.max_turns
+
+    def fold(self, summarize):
+        # summarize(기존 요약, 접을 메시지 목록) -> 새 요약
+        older = self.recent[:-2 * self.max_turns]
+        if not older:
+            return
+        self.summary = summarize(self.summary, older)
+        self.recent = self.recent[-2 * self.max_turns:]
+        self.folded_count += len(older)
+
+    def history(self):
+        # 체인에 넣을 대화 기록: 요약 + 최근 턴 (마지막 사용자 질문은 question으로 따로 전달)
+        lines = []
+        if self.summary:
+            lines.append(f"이전 대화 요약: {self.summary}")
+        for msg in self.recent[:-1]:
+            speaker = "사용자" if msg["role"] == "user" else "AI"
+            lines.append(f"{speaker}: {msg['content']}")
+        return "\n".join(lines)
+
+
+def format_messages(messages):
+    return "\n".join(f"{'사용자' if msg['role'] == 'user' else 'AI'}: {msg['content']}" for msg in messages)
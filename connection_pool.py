@@ -0,0 +1,183 @@
+import threading
+import time
+import streamlit as st
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+
+
+class PoolTimeoutError(Error):
+    pass
+
+
+class PooledConnection:
+    # close()는 실제 연결을 끊지 않고 풀에 반납한다
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            self._pool.release(self._connection, self._created_at)
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, db_config, pool_size=10, pool_recycle=3600, pool_timeout=5, pre_ping=True):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.pool_recycle = pool_recycle
+        self.pool_timeout = pool_timeout
+        self.pre_ping = pre_ping
+        self._idle = []
+        self._open_count = 0
+        self._cond = threading.Condition()
+        self._created = 0
+        self._borrowed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _open(self):
+        connection = mysql.connector.connect(
+            host=self.db_config["host"],
+            user=self.db_config["user"],
+            password=self.db_config["password"],
+            database=self.db_config["database"],
+            autocommit=self.db_config["autocommit"]
+        )
+        with self._cond:
+            self._created += 1
+        return connection, time.monotonic()
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _forget(self):
+        with self._cond:
+            self._open_count -= 1
+            self._cond.notify_all()
+
+    def _validate(self, connection, created_at):
+        # 오래된 연결은 재생성하고, 끊긴 연결은 ping으로 확인 후 교체
+        if self.pool_recycle and time.monotonic() - created_at > self.pool_recycle:
+            self._close_quietly(connection)
+            return self._open()
+        if self.pre_ping:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                self._close_quietly(connection)
+                return self._open()
+        return connection, created_at
+
+    def get_connection(self):
+        started = time.monotonic()
+        deadline = started + self.pool_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection, created_at = self._idle.pop()
+                    break
+                if self._open_count < self.pool_size:
+                    self._open_count += 1
+                    connection, created_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(msg=f"Timed out after {self.pool_timeout}s waiting for a database connection")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self._borrowed += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if connection is None:
+                connection, created_at = self._open()
+            else:
+                connection, created_at = self._validate(connection, created_at)
+        except Error:
+            self._forget()
+            raise
+        return PooledConnection(self, connection, created_at)
+
+    def release(self, connection, created_at):
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            self._close_quietly(connection)
+            self._forget()
+            return
+        with self._cond:
+            self._idle.append((connection, created_at))
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "max_connections": self.pool_size,
+                "in_use": self._open_count - idle,
+                "idle": idle,
+                "created": self._created,
+                "borrowed": self._borrowed,
+                "wait_avg": self._wait_total / self._borrowed if self._borrowed else 0.0,
+                "wait_max": self._wait_max,
+            }
+
+    def close(self, timeout=10):
+        # 빌려간 연결이 모두 반납될 때까지 기다린 뒤 유휴 연결을 닫는다
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._open_count > len(self._idle):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            idle, self._idle = self._idle, []
+            self._open_count -= len(idle)
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # 스케줄러/디스패처 같은 백그라운드 스레드에는 ScriptRunContext가 없어 st.cache_resource가 매번 새로 만들므로
+    # 프로세스 전역 변수에 하나만 두고 모든 모듈(MysqlConnectorPool 포함)이 공유한다
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_CONFIG,
+                    pool_size=DB_CONFIG.get("pool_size", 10),
+                    pool_recycle=DB_CONFIG.get("pool_recycle", 3600),
+                    pool_timeout=DB_CONFIG.get("pool_timeout", 5),
+                    pre_ping=DB_CONFIG.get("pool_pre_ping", True)
+                )
+    return _pool
+
+
+def create_connection():
+    try:
+        return get_pool().get_connection()
+    except Error as e:
+        st.error(f"Error connecting to MySQL database: {e}")
+        return None
@@ -0,0 +1,89 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from api_url import get_crawler_url
+
+
+class CrawlJob:
+    def __init__(self, search_keyword, crawling_option, website, member_no):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.search_keyword = search_keyword
+        self.crawling_option = crawling_option
+        self.website = website
+        self.member_no = member_no
+        self.status = "queued"
+        self.status_code = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.updated_at = self.created_at
+
+
+class CrawlerDispatcher:
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls, *args, **kwargs):
+        if cls.__instance is None:
+            with cls.__instance_lock:
+                if cls.__instance is None:
+                    cls.__instance = cls(*args, **kwargs)
+        return cls.__instance
+
+    def __init__(self, max_workers=4, retries=3, backoff_factor=0.5, timeout=10, max_jobs=500):
+        # 연결을 재사용하는 세션과 재시도 정책. 요청은 백그라운드 스레드에서 보낸다
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawler-dispatch")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, search_keyword, crawling_option, website, member_no):
+        job = CrawlJob(search_keyword, crawling_option, website, member_no)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self.executor.submit(self._send, job)
+        return job
+
+    def _send(self, job):
+        try:
+            url = get_crawler_url(job.search_keyword, job.crawling_option, job.website, job.member_no)
+            response = self.session.get(url, timeout=self.timeout)
+            job.status_code = response.status_code
+            if response.status_code == 200:
+                job.status = "sent"
+            else:
+                job.status = "failed"
+                job.error = response.text
+        except Exception as e:
+            # 요청 실패뿐 아니라 URL 생성 오류 등도 실패로 남겨야 화면 폴링이 끝난다
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.updated_at = datetime.now()
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, member_no, limit=10):
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.member_no == member_no]
+        return list(reversed(jobs))[:limit]
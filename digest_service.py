@@ -0,0 +1,124 @@
+import html
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+UPSERT_WATERMARK = {
+    "mysql": """
+        INSERT INTO tb_mailing_watermark (member_no, search_keyword_no, last_insert_date, last_pmid)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_insert_date = VALUES(last_insert_date), last_pmid = VALUES(last_pmid)
+    """,
+    "sqlite": """
+        INSERT INTO tb_mailing_watermark (member_no, search_keyword_no, last_insert_date, last_pmid)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (member_no, search_keyword_no)
+        DO UPDATE SET last_insert_date = excluded.last_insert_date, last_pmid = excluded.last_pmid
+    """,
+}
+
+
+class MemberDigest:
+    def __init__(self, member_no, member_email, member_name):
+        self.member_no = member_no
+        self.member_email = member_email
+        self.member_name = member_name
+        self.keywords = OrderedDict()
+        self.watermarks = {}
+
+    def add(self, row):
+        self.keywords.setdefault(row["search_keyword"], []).append(row)
+        # 행은 (insert_date, document_pmid) 순으로 오므로 마지막 행이 새 워터마크가 된다
+        self.watermarks[row["search_keyword_no"]] = (row["insert_date"], row["document_pmid"])
+
+    def render(self):
+        parts = [f"<h2>{html.escape(self.member_name or '')}님의 새 논문 알림</h2>"]
+        for keyword, papers in self.keywords.items():
+            parts.append(f"<h3>{html.escape(keyword)} ({len(papers)}건)</h3><ul>")
+            for paper in papers:
+                # 저장된 한국어 번역이 있으면 그것을 사용한다
+                title = paper.get("crawl_data_title_ko") or paper["document_title"]
+                abstract = paper.get("crawl_data_abstract_ko") or paper["document_abstract"]
+                parts.append(
+                    f"<li><strong>{html.escape(title or '')}</strong><br>"
+                    f"{html.escape(paper['document_author'] or '')}<br>"
+                    f"{html.escape(abstract or '')}</li>"
+                )
+            parts.append("</ul>")
+        return "".join(parts)
+
+
+class DigestBuilder:
+    # connection은 DB-API 연결이면 된다 (MySQL 운영 DB 또는 로컬 SQLite 대용)
+    def __init__(self, connection, dialect="mysql"):
+        self.connection = connection
+        self.dialect = dialect
+        self.placeholder = "?" if dialect == "sqlite" else "%s"
+
+    def fetch_new_rows(self, initial_since):
+        # 모든 회원의 알림 키워드에 대해 워터마크 이후의 문서만 한 번에 읽는다
+        p = self.placeholder
+        query = f"""
+            SELECT
+                sk.member_no, m.member_email, m.member_name,
+                sk.search_keyword_no, sk.search_keyword,
+                md.document_pmid, md.document_title, md.document_author, md.document_abstract, md.insert_date,
+                cd.crawl_data_title_ko, cd.crawl_data_abstract_ko
+            FROM tb_search_keyword sk
+            JOIN tb_member m ON m.member_no = sk.member_no
+            LEFT JOIN tb_mailing_watermark wm
+                ON wm.member_no = sk.member_no AND wm.search_keyword_no = sk.search_keyword_no
+            JOIN tb_member_document md
+                ON md.search_keyword_no = sk.search_keyword_no
+                AND (md.insert_date, md.document_pmid) > (COALESCE(wm.last_insert_date, {p}), COALESCE(wm.last_pmid, ''))
+            LEFT JOIN tb_crawl_data cd ON cd.crawl_data_pmid = md.document_pmid
+            WHERE sk.alarm_yn = 'Y'
+            ORDER BY sk.member_no, sk.search_keyword_no, md.insert_date, md.document_pmid
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, (initial_since,))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def build(self, initial_since=None):
+        # 워터마크가 없는 (회원, 키워드)는 initial_since 이후 문서부터 포함한다 (기본: 최근 하루)
+        if initial_since is None:
+            initial_since = datetime.now() - timedelta(days=1)
+        digests = OrderedDict()
+        for row in self.fetch_new_rows(initial_since):
+            digest = digests.get(row["member_no"])
+            if digest is None:
+                digest = digests[row["member_no"]] = MemberDigest(row["member_no"], row["member_email"], row["member_name"])
+            digest.add(row)
+        return list(digests.values())
+
+    def advance_watermarks(self, digests):
+        # 메일 발송이 끝난 다이제스트의 워터마크만 한 번의 executemany로 갱신한다
+        rows = [
+            (digest.member_no, search_keyword_no, insert_date, pmid)
+            for digest in digests
+            for search_keyword_no, (insert_date, pmid) in digest.watermarks.items()
+        ]
+        if not rows:
+            return
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(UPSERT_WATERMARK[self.dialect], rows)
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+
+def build_member_digests(initial_since=None):
+    # 앱/배치에서 쓰는 진입점: 풀에서 연결 하나를 빌려 모든 회원의 다이제스트를 만든다
+    from mysql_connector_pool import MysqlConnectorPool
+    with MysqlConnectorPool.instance().borrow() as connection:
+        return DigestBuilder(connection).build(initial_since)
+
+
+def mark_digests_sent(digests):
+    from mysql_connector_pool import MysqlConnectorPool
+    with MysqlConnectorPool.instance().borrow() as connection:
+        DigestBuilder(connection).advance_watermarks(digests)
@@ -0,0 +1,78 @@
+import difflib
+import re
+
+SECTION_MARKER = re.compile(r"^<<<SECTION (\d+)>>>\s*$", re.MULTILINE)
+HEADING = re.compile(r"^#{1,6}\s+(.*)$")
+WORD = re.compile(r"\w+")
+
+
+def split_sections(markdown):
+    # 제목(#) 줄을 기준으로 문서를 섹션 목록으로 나눈다. 첫 제목 앞의 내용은 0번 섹션이 된다
+    sections = []
+    current = []
+    for line in markdown.splitlines(keepends=True):
+        if HEADING.match(line) and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+
+def join_sections(sections):
+    return "".join(section if section.endswith("\n") else section + "\n" for section in sections)
+
+
+def section_title(section, index):
+    first_line = section.splitlines()[0] if section else ""
+    match = HEADING.match(first_line)
+    return match.group(1).strip() if match else f"섹션 {index}"
+
+
+def select_sections(sections, question, limit=2):
+    # 질문과 겹치는 단어가 많은 섹션을 고른다 (제목에 나온 단어는 가중치를 더 준다)
+    words = set(WORD.findall(question.lower()))
+    scores = []
+    for index, section in enumerate(sections):
+        title_words = set(WORD.findall(section_title(section, index).lower()))
+        body_words = set(WORD.findall(section.lower()))
+        scores.append((3 * len(words & title_words) + len(words & body_words), index))
+    scores.sort(reverse=True)
+    selected = [index for score, index in scores[:limit] if score > 0]
+    return sorted(selected) or list(range(min(limit, len(sections))))
+
+
+def build_context(sections, selected):
+    outline = "\n".join(f"{index}. {section_title(section, index)}" for index, section in enumerate(sections))
+    blocks = "\n".join(f"<<<SECTION {index}>>>\n{sections[index]}" for index in selected)
+    return f"문서 목차:\n{outline}\n\n수정 대상 섹션:\n{blocks}"
+
+
+def parse_section_edits(response, allowed):
+    # "<<<SECTION n>>>" 표시 뒤의 내용을 n번 섹션의 새 내용으로 해석한다
+    edits = {}
+    matches = list(SECTION_MARKER.finditer(response))
+    for i, match in enumerate(matches):
+        index = int(match.group(1))
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+        if index in allowed:
+            edits[index] = response[match.end():end].strip("\n") + "\n"
+    return edits
+
+
+def apply_section_edits(sections, edits):
+    return [edits.get(index, section) for index, section in enumerate(sections)]
+
+
+def section_diff(sections, edits):
+    lines = []
+    for index in sorted(edits):
+        lines.extend(difflib.unified_diff(
+            sections[index].splitlines(),
+            edits[index].splitlines(),
+            fromfile=f"before: {section_title(sections[index], index)}",
+            tofile=f"after: {section_title(edits[index], index)}",
+            lineterm="",
+        ))
+    return "\n".join(lines)
@@ -0,0 +1,42 @@
+# 회원별 즐겨찾기 읽기 모델 관리
+# tb_member_favorite_paper: (회원, 논문) 한 행에 카드에 필요한 필드를 둔다
+# tb_member_favorite_keyword: (회원, 키워드, 논문) 한 행씩 두어 키워드 필터와 개수를 인덱스로 처리한다
+# 호출하는 쪽이 start_transaction()으로 연 트랜잭션 안에서 즐겨찾기 변경과 같은 커서로 호출한다
+
+INSERT_FAVORITE_PAPER = """
+    INSERT IGNORE INTO tb_member_favorite_paper
+        (member_no, document_pmid, document_title, sort_title, document_author, document_abstract, favorited_at)
+    SELECT
+        %s,
+        md.document_pmid,
+        MAX(md.document_title),
+        LEFT(MAX(md.document_title), 191),
+        MAX(md.document_author),
+        MAX(md.document_abstract),
+        NOW()
+    FROM tb_member_document md
+    WHERE md.document_pmid = %s
+    GROUP BY md.document_pmid
+"""
+
+INSERT_FAVORITE_KEYWORDS = """
+    INSERT IGNORE INTO tb_member_favorite_keyword (member_no, search_keyword, document_pmid)
+    SELECT DISTINCT %s, sk.search_keyword, md.document_pmid
+    FROM tb_member_document md
+    JOIN tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
+    WHERE md.document_pmid = %s
+"""
+
+DELETE_FAVORITE_PAPER = "DELETE FROM tb_member_favorite_paper WHERE member_no = %s AND document_pmid = %s"
+
+DELETE_FAVORITE_KEYWORDS = "DELETE FROM tb_member_favorite_keyword WHERE member_no = %s AND document_pmid = %s"
+
+
+def add_favorite_paper(cursor, member_no, pmid):
+    cursor.execute(INSERT_FAVORITE_PAPER, (member_no, pmid))
+    cursor.execute(INSERT_FAVORITE_KEYWORDS, (member_no, pmid))
+
+
+def remove_favorite_paper(cursor, member_no, pmid):
+    cursor.execute(DELETE_FAVORITE_KEYWORDS, (member_no, pmid))
+    cursor.execute(DELETE_FAVORITE_PAPER, (member_no, pmid))
@@ -1,37 +1,76 @@
 import streamlit as st
-import requests
-from datetime import datetime
+from datetime import datetime, time
 import mysql.connector
 from mysql.connector import Error
-from config import DB_CONFIG, AI_CONFIG
-import deepl
+from config import DB_CONFIG
 from mysql_connector_pool import MysqlConnectorPool
-from api_url import get_crawler_url
+from crawler_dispatcher import CrawlerDispatcher
 
-mysql = MysqlConnectorPool()
+mysql = MysqlConnectorPool.instance()
 
 def fetch_keyword_alarmed(member_no):
-    query = f"SELECT * FROM tb_search_keyword WHERE alarm_yn = 'Y' AND member_no = '{member_no}'"
-    return mysql.read(query=query)
+    query = "SELECT * FROM tb_search_keyword WHERE alarm_yn = 'Y' AND member_no = %s"
+    return mysql.read(query=query, params=(member_no,))
+
+def fetch_member_keywords(member_no):
+    query = """
+        SELECT search_keyword, alarm_yn, alarm_hour, alarm_minute, crawling_option
+        FROM tb_search_keyword
+        WHERE member_no = %s
+        ORDER BY search_keyword
+    """
+    return mysql.read(query=query, params=(member_no,)) or []
+
+def apply_alarm_changes(member_no, enable, disable, alarm_hour, alarm_minute, crawling_option):
+    # (member_no, search_keyword) 유니크 키에 기대어 확인 없이 upsert하고, 해제는 IN 한 문장으로 처리한다
+    with mysql.transaction() as cursor:
+        if enable:
+            now = datetime.now()
+            cursor.executemany(
+                """
+                INSERT INTO tb_search_keyword (search_keyword_no, search_keyword, alarm_yn, member_no, insert_date, alarm_hour, alarm_minute, crawling_option)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE alarm_yn = VALUES(alarm_yn), alarm_hour = VALUES(alarm_hour),
+                    alarm_minute = VALUES(alarm_minute), crawling_option = VALUES(crawling_option)
+                """,
+                [(mysql.generate_no(), keyword, "Y", member_no, now, alarm_hour, alarm_minute, crawling_option) for keyword in enable],
+            )
+        if disable:
+            placeholders = ", ".join(["%s"] * len(disable))
+            cursor.execute(
+                f"UPDATE tb_search_keyword SET alarm_yn = 'N' WHERE member_no = %s AND search_keyword IN ({placeholders})",
+                (member_no, *disable),
+            )
 
 def send_message_to_queue(search_keyword, crawling_option, website, member_no):
-    url = get_crawler_url(search_keyword, crawling_option, website, member_no)
-    response = requests.get(url, timeout=10)  # Set a timeout of 10 seconds
-    return response
-
-def translate(text: str):
-    try:
-        translator = deepl.Translator(AI_CONFIG["deepl"]["api_key"])
-        translated = translator.translate_text(text, target_lang="KO").text
-        return translated
-    except Exception as e:
-        st.error(f"Translation error: {e}")
-        return text
-    
-def save_translation_to_db(pmid, translated_abstract):
-    query = "UPDATE tb_crawl_data SET crawl_data_abstract_ko = %s WHERE crawl_data_pmid = %s"
-    params = (translated_abstract, pmid)
-    mysql.write(query=query, params=params)
+    # 요청은 백그라운드에서 재시도와 함께 전송되고, 상태를 조회할 수 있는 작업을 바로 돌려준다
+    return CrawlerDispatcher.instance().submit(search_keyword, crawling_option, website, member_no)
+
+CRAWL_STATUS_LABELS = {"queued": "⏳ 대기 중", "sent": "✅ 전송 완료", "failed": "❌ 실패"}
+
+def render_crawl_jobs(jobs):
+    if not jobs:
+        return
+    st.markdown("*최근 크롤링 요청*")
+    for job in jobs:
+        status = CRAWL_STATUS_LABELS.get(job.status, job.status)
+        detail = f" (Status code: {job.status_code}, Message: {job.error})" if job.status == "failed" else ""
+        st.write(f"{job.created_at:%H:%M:%S} · {job.search_keyword} · {status}{detail}")
+
+@st.experimental_fragment(run_every=2)
+def poll_crawl_jobs(member_no):
+    jobs = CrawlerDispatcher.instance().jobs_for(member_no)
+    if not any(job.status == "queued" for job in jobs):
+        # 대기 중인 요청이 없으면 앱 전체를 한 번 다시 실행해 폴링을 멈춘다
+        st.rerun()
+    render_crawl_jobs(jobs)
+
+def display_crawl_jobs(member_no):
+    jobs = CrawlerDispatcher.instance().jobs_for(member_no)
+    if any(job.status == "queued" for job in jobs):
+        poll_crawl_jobs(member_no)
+    else:
+        render_crawl_jobs(jobs)
 
 def display_mailing_service():
     st.header("📧 메일링 서비스")
@@ -51,16 +90,10 @@ def display_mailing_service():
         st.session_state["search_keyword"] = ""
     if "crawling_option" not in st.session_state:
         st.session_state["crawling_option"] = ""
-    if "crawl_date" not in st.session_state:
-        st.session_state["crawl_date"] = None
     if "crawl_hour" not in st.session_state:
         st.session_state["crawl_hour"] = datetime.now().hour
     if "crawl_minute" not in st.session_state:
         st.session_state["crawl_minute"] = datetime.now().minute
-    if "page" not in st.session_state:
-        st.session_state["page"] = 1
-    if "start_page" not in st.session_state:
-        st.session_state["start_page"] = 1
     if "translation_states" not in st.session_state:
         st.session_state["translation_states"] = {}
     if "translated_abstracts" not in st.session_state:
@@ -82,63 +115,42 @@ def display_mailing_service():
     with st.container():
         if st.button("Start Crawling 🚀", use_container_width=True, key="start_crawling"):
             if search_keyword is not None:
-                with st.spinner('Sending message to queue...'):
-                    try:
-                        response = send_message_to_queue(search_keyword, st.session_state["crawling_option"], website, member_no)
-                        if response and response.status_code == 200:
-                            st.success("Message sent successfully!")
-                        else:
-                            st.error(f"Failed to send message. Status code: {response.status_code}, Message: {response.text}")
-                    except requests.exceptions.RequestException as e:
-                        st.error(f"Failed to send message. Error: {str(e)}")
+                job = send_message_to_queue(search_keyword, st.session_state["crawling_option"], website, member_no)
+                st.success(f"Message queued! (Job ID: {job.job_id})")
+
+    display_crawl_jobs(member_no)
 
 def set_mailing_scheduler():
     # st.markdown("<h3>알림 만들기</h3>", unsafe_allow_html=True)
     alarm_keyword = st.text_input(label="다음 키워드에 대한 알림 만들기")
+    time_col, option_col = st.columns([1, 1])
+    with time_col:
+        alarm_time = st.time_input("크롤링 시각", time(st.session_state["crawl_hour"], st.session_state["crawl_minute"]), step=600)
+        st.session_state["crawl_hour"] = alarm_time.hour
+        st.session_state["crawl_minute"] = alarm_time.minute
+    with option_col:
+        alarm_option = st.selectbox("크롤링 옵션", ("Most Recent", "Best Match"), key="alarm_crawling_option")
     member_no = st.session_state.member_no
-    alarmed_keywords = fetch_keyword_alarmed(member_no)
-    st.markdown(f"""*알림이 설정된 키워드*&nbsp;⬇️""")
-    for idx, keyword in enumerate(alarmed_keywords):
-        with st.container():
-            keyword_col, button_col = st.columns([3, 1])
-            with keyword_col:
-                st.markdown(f"""#### KEYWORD: {keyword['search_keyword']}""")
-            with button_col:
-                disable_button = st.button(label="Disable", key=f"disable_{idx}", use_container_width=True)
-        if disable_button:
-            query = f"""
-                UPDATE tb_search_keyword 
-                SET alarm_yn = 'N' 
-                WHERE search_keyword='{keyword["search_keyword"]}' AND member_no='{member_no}' 
-            """
-            mysql.write(query=query)
+    member_keywords = fetch_member_keywords(member_no)
+    alarmed = [keyword["search_keyword"] for keyword in member_keywords if keyword["alarm_yn"] == "Y"]
+    selected = st.multiselect(
+        "알림이 설정된 키워드 ⬇️",
+        [keyword["search_keyword"] for keyword in member_keywords],
+        default=alarmed,
+        key="alarm_keyword_selection",
+    )
 
     set_alarm_button = st.button("알림 설정 완료 📩", use_container_width=True, key="set_alarm_button")
     if set_alarm_button:
-        # 중복 확인 쿼리
-        check_query = f"""
-            SELECT COUNT(*) as count FROM tb_search_keyword 
-            WHERE search_keyword = '{alarm_keyword}' AND member_no = '{member_no}'
-        """
-        result = mysql.read(check_query)
-        if result[0]['count'] == 0:
-            # 중복이 아닐 때만 삽입
-            query = f"""
-                INSERT INTO tb_search_keyword (search_keyword_no, search_keyword, alarm_yn, member_no, insert_date)
-                VALUES ('{mysql.generate_no()}', '{alarm_keyword}', 'Y', '{member_no}', NOW())
-            """
-            mysql.write(query)
-            st.success("알림이 설정되었습니다!")
-        else:
-            # 중복일 때는 alarm_yn을 'Y'로 업데이트
-            update_query = f"""
-                UPDATE tb_search_keyword 
-                SET alarm_yn = 'Y' 
-                WHERE search_keyword = '{alarm_keyword}' AND member_no = '{member_no}'
-            """
-            mysql.write(update_query)
-            st.success("기존 키워드에 대한 알림이 활성화되었습니다!")
+        # 새로 선택한 키워드와 입력한 키워드는 켜고, 선택 해제한 키워드는 끈다
+        enable = [keyword for keyword in selected if keyword not in alarmed]
+        if alarm_keyword and alarm_keyword not in enable:
+            enable.append(alarm_keyword)
+        disable = [keyword for keyword in alarmed if keyword not in selected]
+        try:
+            apply_alarm_changes(member_no, enable, disable, alarm_time.hour, alarm_time.minute, alarm_option)
+            st.success(f"알림이 설정되었습니다! (활성화 {len(enable)}건, 비활성화 {len(disable)}건)")
+        except Exception as e:
+            st.error(f"Error updating alarms: {e}")
+            return
         st.rerun()
-
-
-
@@ -1,47 +1,31 @@
 import streamlit as st
 import bcrypt
-from config import DB_CONFIG 
-import mysql.connector
+import hmac
 from mysql.connector import Error
+from connection_pool import create_connection
 from mailing_service import display_mailing_service, set_mailing_scheduler
 from ai_service import ai_service
 from search_service import search_service
 from scrap_service import scrap_service
+from alarm_scheduler import AlarmScheduler
 
-def fetch_user_credentials():
+def fetch_member_by_email(email):
+    connection = create_connection()
+    if not connection:
+        return None
     try:
-        connection = mysql.connector.connect(
-            host=DB_CONFIG["host"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            database=DB_CONFIG["database"],
-            autocommit=DB_CONFIG["autocommit"]
-        )
         cursor = connection.cursor(dictionary=True)
-        query = "SELECT member_no, member_email, member_name, password FROM tb_member"
-        cursor.execute(query)
-        records = cursor.fetchall()
-        return records
+        query = "SELECT member_no, member_email, member_name, password FROM tb_member WHERE member_email = %s"
+        cursor.execute(query, (email,))
+        record = cursor.fetchone()
+        return record
     except Error as e:
         print(f"Error fetching data: {e}")
-        return []
+        return None
     finally:
         cursor.close()
         connection.close()
 
-user_records = fetch_user_credentials()
-
-for record in user_records:
-    if not record['password'].startswith('$2b$'):
-        record['password'] = bcrypt.hashpw(record['password'].encode(), bcrypt.gensalt()).decode()
-
-USERNAMES = [record['member_email'] for record in user_records]
-NAMES = [record['member_name'] for record in user_records]
-HASHED_PASSWORDS = [record['password'] for record in user_records]
-MEMBER_NOS = {record['member_email']: record['member_no'] for record in user_records}
-
-CREDENTIALS = {username: {"name": name, "password": hashed_password, "member_no": MEMBER_NOS[username]} for username, name, hashed_password in zip(USERNAMES, NAMES, HASHED_PASSWORDS)}
-
 if 'authentication_status' not in st.session_state:
     st.session_state.authentication_status = None
 if 'name' not in st.session_state:
@@ -52,11 +36,26 @@ if 'member_no' not in st.session_state:
     st.session_state.member_no = None
 
 def authenticate(username, password):
-    user = CREDENTIALS.get(username)
-    if user and bcrypt.checkpw(password.encode(), user['password'].encode()):
-        return user['name'], user['member_no']
+    # 로그인 시점에 해당 회원 한 명만 조회하고 검증한다
+    user = fetch_member_by_email(username)
+    if not user:
+        return None, None
+    stored_password = user['password']
+    if stored_password.startswith('$2b$'):
+        matched = bcrypt.checkpw(password.encode(), stored_password.encode())
+    else:
+        # bcrypt로 해시되지 않은 기존 계정은 평문과 비교한다
+        matched = hmac.compare_digest(password.encode(), stored_password.encode())
+    if matched:
+        return user['member_name'], user['member_no']
     return None, None
 
+# 알림 키워드 스케줄러는 프로세스당 한 번만 시작된다
+AlarmScheduler.instance().start()
+
+SECTIONS = ["논문 검색 기능", "논문 스크랩 기능", "AI 서비스", "메일링 서비스"]
+PERSISTENT_WIDGET_KEYS = ["page_size", "keyword_filter_scrap", "toggle_document_generation"]
+
 @st.experimental_dialog("알림 만들기")
 def show_mailing_scheduler():
     set_mailing_scheduler()
@@ -91,18 +90,24 @@ if st.session_state.authentication_status:
     col1, col2, col3 = st.columns([1, 12, 1])
 
     with col2:
-        tab1, tab2, tab3, tab4 = st.tabs(["논문 검색 기능", "논문 스크랩 기능", "AI 서비스", "메일링 서비스"])
+        # 선택된 메뉴만 실행되도록 탭 대신 라디오 버튼으로 이동한다
+        section = st.radio("메뉴", SECTIONS, horizontal=True, key="active_section", label_visibility="collapsed")
+
+        # 렌더링되지 않은 위젯 상태는 정리되므로 메뉴를 옮겨도 유지되도록 다시 저장한다
+        for key in PERSISTENT_WIDGET_KEYS:
+            if key in st.session_state:
+                st.session_state[key] = st.session_state[key]
 
-        with tab1:
+        if section == "논문 검색 기능":
             search_service()
 
-        with tab2:
+        elif section == "논문 스크랩 기능":
             scrap_service()
 
-        with tab3:
+        elif section == "AI 서비스":
             ai_service()
             
-        with tab4:
+        elif section == "메일링 서비스":
             display_mailing_service()
 
             if st.button("알림 만들기", key="alert_button"):
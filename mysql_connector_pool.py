@@ -1,15 +1,14 @@
-import pymysql
-import pymysqlpool
-import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import string
 import random
-from config import DB_CONFIG as config
+from connection_pool import get_pool
 
 
 class MysqlConnectorPool:
     __instance = None
-    db_manager = None
+    __instance_lock = threading.Lock()
 
     @classmethod
     def __getInstance(cls):
@@ -17,65 +16,106 @@ class MysqlConnectorPool:
 
     @classmethod
     def instance(cls, *args, **kwargs):
-        cls.__instance = cls(*args, **kwargs)
-        cls.instance = cls.__getInstance()
-        return cls.__instance
+        # Streamlit 세션(스레드)들이 프로세스당 하나의 풀을 공유하도록 한다
+        if cls.__getInstance() is None:
+            with cls.__instance_lock:
+                if cls.__getInstance() is None:
+                    cls.__instance = cls(*args, **kwargs)
+        return cls.__getInstance()
 
-    def __init__(self, max_connections=10):
-        self.config = config
-        self.pool = None
-        self.max_connections = max_connections
-        self.db_config = self.config
+    def __init__(self):
+        # 검색/스크랩/번역 모듈과 같은 connection_pool의 전역 풀을 쓴다 (연결 수 상한과 지표도 하나)
+        self.pool = get_pool()
 
     def connect(self):
-        self.pool = pymysqlpool.ConnectionPool(
-            host=self.db_config['host'],
-            user=self.db_config['user'],
-            password=self.db_config['password'],
-            database=self.db_config['database'],
-            autocommit=True
-        )
-
         return self.pool
 
-    def disconnect(self):
-        if self.pool:
-            self.pool.close()
-            self.pool = None
+    def disconnect(self, timeout=10):
+        self.pool.close(timeout)
 
-    def read(self, query):
-        connection = self.connect().get_connection()
+    @contextmanager
+    def borrow(self):
+        connection = self.pool.get_connection()
         try:
-            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                connection.commit()
-                return rows
+            yield connection
+        finally:
+            connection.close()
+
+    def stats(self):
+        return self.pool.stats()
+
+    # read/write는 빌릴 때마다 문장을 한 번만 실행하므로 텍스트 프로토콜을 그대로 쓴다
+    # (prepared 커서는 준비/해제 왕복이 더해져 한 번 실행에는 오히려 느리다)
+    def read(self, query, params=None):
+        try:
+            with self.borrow() as connection:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                    connection.commit()
+                    return rows
+                finally:
+                    cursor.close()
 
         except Exception as e:
             print(f"Error executing query: {str(e)}")
             return None
 
-        finally:
-            connection.close()
-
-    def write(self, query):
-        connection = self.connect().get_connection()
+    def write(self, query, params=None):
         try:
-            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute(query)
+            with self.borrow() as connection:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    cursor.execute(query, params)
+                    connection.commit()
+                    return cursor.rowcount
+                finally:
+                    cursor.close()
 
         except Exception as e:
             print(e)
             # return None
             return False
 
-        finally:
-            connection.close()
+    def write_many(self, query, seq_params):
+        # INSERT/REPLACE는 mysql.connector가 다중 VALUES 한 문장으로 묶어 한 번에 전송하므로 일반 커서를 쓰고,
+        # UPDATE/DELETE처럼 행마다 반복되는 문장은 prepared 커서로 한 번만 준비해 바이너리 프로토콜로 실행한다
+        # 어느 쪽이든 한 트랜잭션 안에서 실행하고 커밋은 한 번만 한다
+        seq_params = list(seq_params)
+        if not seq_params:
+            return 0
+        batched = query.lstrip().split(None, 1)[0].upper() in ("INSERT", "REPLACE")
+        with self.borrow() as connection:
+            connection.start_transaction()
+            cursor = connection.cursor() if batched else connection.cursor(prepared=True)
+            try:
+                cursor.executemany(query, seq_params)
+                connection.commit()
+                return cursor.rowcount
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.borrow() as connection:
+            connection.start_transaction()
+            cursor = connection.cursor(dictionary=True)
+            try:
+                yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
 
     def generate_no(self):
         now = datetime.now()
         formattedData = now.strftime("%Y%m%d%H%M%S")
         secure_code = ''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(6))
         number = formattedData + secure_code
-        return number
\ No newline at end of file
+        return number
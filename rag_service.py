@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import streamlit as st
+from cachetools import TTLCache
+from langchain.prompts import PromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain.chat_models import ChatOpenAI
+from config import AI_CONFIG
+from chat_memory import format_messages
+
+MODEL_NAME = AI_CONFIG["openai"].get("model", "gpt-3.5-turbo")
+
+QA_TEMPLATE = """다음과 같은 맥락을 사용하여 마지막 질문에 대답하십시오.
+                만약 답을 모르면 모른다고만 말하고 답을 지어내려고 하지 마십시오.
+                답변은 최대 세 문장으로 하고 가능한 한 간결하게 유지하십시오.
+                항상 '질문해주셔서 감사합니다!'라고 답변 끝에 말하십시오.
+                {history}
+                {context}
+                질문: {question}
+                도움이 되는 답변:"""
+
+GENERATION_TEMPLATE = """사용자의 요청 사항에 따라 아래 문서의 섹션을 수정하시오.
+                    문서 전체가 아니라 목차와 수정 대상 섹션만 주어집니다.
+                    수정한 섹션만 "<<<SECTION 번호>>>" 줄로 시작하여 해당 섹션의 전체 내용을 출력하고, 수정하지 않은 섹션은 출력하지 마시오.
+                    {history}
+                    {context}
+                    질문: {question}
+                    수정된 섹션:"""
+
+SUMMARY_TEMPLATE = """다음은 지금까지의 대화 요약과 그 이후에 이어진 대화입니다.
+                두 내용을 합쳐 이후 질문에 답하는 데 필요한 정보만 남긴 간결한 요약을 작성하십시오.
+                기존 요약: {summary}
+                이어진 대화:
+                {conversation}
+                새 요약:"""
+
+
+class ResponseCache:
+    # (모델, 프롬프트 템플릿, 검색된 맥락, 대화 기록, 질문)이 모두 같은 요청의 답변을 TTL 동안 재사용한다
+    def __init__(self, max_size=512, ttl=60 * 60 * 24):
+        self._items = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name, template, context, question, history=""):
+        digest = hashlib.sha256()
+        for part in (model_name, template, context, history, question):
+            digest.update(hashlib.sha256(part.encode("utf-8")).digest())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            return self._items.get(key)
+
+    def put(self, key, response):
+        with self._lock:
+            self._items[key] = response
+
+
+@st.cache_resource
+def get_llm(model_name=MODEL_NAME, temperature=0):
+    return ChatOpenAI(model_name=model_name, temperature=temperature, openai_api_key=AI_CONFIG["openai"]["api_key"])
+
+
+@st.cache_resource
+def get_chain(template, model_name=MODEL_NAME, temperature=0):
+    return PromptTemplate.from_template(template) | get_llm(model_name, temperature) | StrOutputParser()
+
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache(
+        max_size=AI_CONFIG["openai"].get("response_cache_size", 512),
+        ttl=AI_CONFIG["openai"].get("response_cache_ttl", 60 * 60 * 24),
+    )
+
+
+def format_documents(documents):
+    return "\n\n".join(document.page_content for document in documents)
+
+
+def stream_answer(template, context, question, history="", model_name=MODEL_NAME):
+    cache = get_response_cache()
+    key = cache.make_key(model_name, template, context, question, history)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    response = ""
+    for token in get_chain(template, model_name).stream({"context": context, "question": question, "history": history}):
+        response += token
+        yield token
+    cache.put(key, response)
+
+
+def summarize_conversation(summary, messages, model_name=MODEL_NAME):
+    chain = get_chain(SUMMARY_TEMPLATE, model_name)
+    return chain.invoke({"summary": summary or "없음", "conversation": format_messages(messages)})
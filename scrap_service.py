@@ -1,35 +1,12 @@
 import streamlit as st
-import mysql.connector
 from mysql.connector import Error
-from config import DB_CONFIG, AI_CONFIG
-import deepl
+from connection_pool import create_connection
+from favorite_read_model import add_favorite_paper, remove_favorite_paper
+from translation_service import translate, translate_paper, translate_visible_papers
 from datetime import datetime
 import random
 import string
 
-def create_connection():
-    try:
-        connection = mysql.connector.connect(
-            host=DB_CONFIG["host"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            database=DB_CONFIG["database"],
-            autocommit=DB_CONFIG["autocommit"]
-        )
-        return connection
-    except Error as e:
-        st.error(f"Error connecting to MySQL database: {e}")
-        return None
-
-def translate(text: str):
-    try:
-        translator = deepl.Translator(AI_CONFIG["deepl"]["api_key"])
-        translated = translator.translate_text(text, target_lang="KO").text
-        return translated
-    except Exception as e:
-        st.error(f"Translation error: {e}")
-        return text
-
 def generate_no():
     now = datetime.now()
     formatted_data = now.strftime("%Y%m%d%H%M%S")
@@ -37,57 +14,91 @@ def generate_no():
     number = formatted_data + secure_code
     return number
 
-def save_translation_to_db(pmid, translated_abstract):
+def fetch_scraped_papers(member_no, keywords=None):
     connection = create_connection()
     if connection:
         try:
-            cursor = connection.cursor()
-            query = "UPDATE tb_crawl_data SET crawl_data_abstract_ko = %s WHERE crawl_data_pmid = %s"
-            cursor.execute(query, (translated_abstract, pmid))
-            connection.commit()
+            cursor = connection.cursor(dictionary=True)
+            # 읽기 모델에서 회원의 즐겨찾기를 (member_no, sort_title) 인덱스 순서대로 읽고,
+            # 키워드 필터는 (member_no, search_keyword) 인덱스로 논문 번호를 고른다
+            keyword_filter = ""
+            params = [member_no]
+            if keywords:
+                keyword_filter = f"""
+                AND fp.document_pmid IN (
+                    SELECT fk.document_pmid
+                    FROM tb_member_favorite_keyword fk
+                    WHERE fk.member_no = %s AND fk.search_keyword IN ({', '.join(['%s'] * len(keywords))})
+                )
+                """
+                params.append(member_no)
+                params.extend(keywords)
+            query = f"""
+            SELECT
+                fp.document_title,
+                fp.document_author,
+                fp.document_abstract,
+                fp.document_pmid
+            FROM
+                tb_member_favorite_paper fp
+            WHERE
+                fp.member_no = %s
+                {keyword_filter}
+            ORDER BY
+                fp.sort_title, fp.document_pmid
+            """
+            cursor.execute(query, params)
+            records = cursor.fetchall()
+            if not records:
+                return records
+
+            # 카드에 보여줄 키워드는 가져온 논문들에 대해서만 한 번에 읽는다
+            pmids = [record['document_pmid'] for record in records]
+            query = f"""
+            SELECT document_pmid, search_keyword
+            FROM tb_member_favorite_keyword
+            WHERE member_no = %s AND document_pmid IN ({', '.join(['%s'] * len(pmids))})
+            ORDER BY search_keyword
+            """
+            cursor.execute(query, [member_no] + pmids)
+            keywords_by_pmid = {}
+            for row in cursor.fetchall():
+                keywords_by_pmid.setdefault(row['document_pmid'], []).append(row['search_keyword'])
+            for record in records:
+                record['search_keyword'] = ", ".join(keywords_by_pmid.get(record['document_pmid'], []))
+            return records
         except Error as e:
-            st.error(f"Error saving translation to database: {e}")
+            st.error(f"Error fetching data: {e}")
+            return []
         finally:
             cursor.close()
             connection.close()
+    else:
+        return []
 
-def fetch_scraped_papers(member_no):
+def fetch_scraped_keyword_counts(member_no):
+    # 멀티셀렉트에 표시할 키워드별 스크랩 논문 수 (읽기 모델의 (member_no, search_keyword) 인덱스 범위에서 센다)
     connection = create_connection()
     if connection:
         try:
             cursor = connection.cursor(dictionary=True)
             query = """
-            SELECT DISTINCT
-                md.document_title, 
-                md.document_author, 
-                md.document_abstract, 
-                md.document_pmid,
-                sk.search_keyword
-            FROM 
-                tb_member_document md
-            JOIN 
-                tb_user_favorite uf ON md.document_pmid = uf.document_pmid
-            JOIN 
-                tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
-            WHERE 
-                uf.member_no = %s
-            ORDER BY 
-                md.document_title
+            SELECT search_keyword, COUNT(*) AS paper_count
+            FROM tb_member_favorite_keyword
+            WHERE member_no = %s
+            GROUP BY search_keyword
+            ORDER BY search_keyword
             """
             cursor.execute(query, (member_no,))
-            records = cursor.fetchall()
-            return records
+            return {row['search_keyword']: row['paper_count'] for row in cursor.fetchall()}
         except Error as e:
-            st.error(f"Error fetching data: {e}")
-            return []
+            st.error(f"Error fetching keyword counts: {e}")
+            return {}
         finally:
             cursor.close()
             connection.close()
     else:
-        return []
-
-def fetch_keywords_from_scraped_papers(papers):
-    return list(set([paper['search_keyword'] for paper in papers]))
+        return {}
 
 def is_favorited(member_no, pmid):
     connection = create_connection()
@@ -112,21 +123,49 @@ def toggle_favorite(member_no, pmid):
     if connection:
         try:
             cursor = connection.cursor()
-            if is_favorited(member_no, pmid):
+            # autocommit 설정과 관계없이 즐겨찾기와 읽기 모델을 한 트랜잭션으로 바꾼다
+            connection.start_transaction()
+            # 같은 연결·트랜잭션 안에서 잠그며 확인해 동시 토글이 중복 즐겨찾기를 만들지 않게 한다
+            query = "SELECT COUNT(*) FROM tb_user_favorite WHERE member_no = %s AND document_pmid = %s FOR UPDATE"
+            cursor.execute(query, (member_no, pmid))
+            if cursor.fetchone()[0] > 0:
                 query = "DELETE FROM tb_user_favorite WHERE member_no = %s AND document_pmid = %s"
                 cursor.execute(query, (member_no, pmid))
+                remove_favorite_paper(cursor, member_no, pmid)
             else:
                 user_favorite_no = generate_no()
                 query = "INSERT INTO tb_user_favorite (user_favorite_no, member_no, document_pmid) VALUES (%s, %s, %s)"
                 cursor.execute(query, (user_favorite_no, member_no, pmid))
+                add_favorite_paper(cursor, member_no, pmid)
             connection.commit()
         except Error as e:
+            connection.rollback()
             st.error(f"Error toggling favorite: {e}")
         finally:
             cursor.close()
             connection.close()
 
-def display_paper(record, translation_state, translated_abstract=None):
+def toggle_translation(record):
+    pmid = record['document_pmid']
+    translation_state = st.session_state["translation_states"].get(pmid, False)
+    if not translation_state and pmid not in st.session_state["translated_abstracts"]:
+        _, translated_abstract = translate_paper(record)
+        st.session_state["translated_abstracts"][pmid] = translated_abstract
+    st.session_state["translation_states"][pmid] = not translation_state
+
+def toggle_favorite_card(member_no, pmid):
+    toggle_favorite(member_no, pmid)
+    st.session_state["favorite_pmids"] ^= {pmid}
+
+# 카드 단위 fragment: 번역/즐겨찾기 버튼은 앱 전체가 아닌 해당 카드만 다시 그린다
+@st.experimental_fragment
+def display_paper(record):
+    pmid = record['document_pmid']
+    member_no = st.session_state.member_no
+    translation_state = st.session_state["translation_states"].get(pmid, False)
+    translated_abstract = st.session_state["translated_abstracts"].get(pmid)
+    favorited = pmid in st.session_state["favorite_pmids"]
+
     if translation_state and translated_abstract:
         title = translate(record['document_title'])
         abstract = translated_abstract
@@ -134,10 +173,6 @@ def display_paper(record, translation_state, translated_abstract=None):
         title = record['document_title']
         abstract = record['document_abstract']
 
-    pmid = record['document_pmid']
-    member_no = st.session_state.member_no
-    favorited = is_favorited(member_no, pmid)
-
     st.markdown(
         f"""
         <div style="border: 2px solid #5b5b5b; padding: 10px; border-radius: 10px; margin-bottom: 10px; position: relative;">
@@ -152,41 +187,51 @@ def display_paper(record, translation_state, translated_abstract=None):
 
     col1, col2, col3 = st.columns([18.2, 1.8, 1])
     with col2:
-        if st.button("Translate", key=f"translate_{pmid}_{record['document_title']}", help="Translate the abstract to Korean"):
-            if not translation_state:
-                translated_abstract = translate(record['document_abstract'])
-                st.session_state["translated_abstracts"][pmid] = translated_abstract
-                save_translation_to_db(pmid, translated_abstract)
-            st.session_state["translation_states"][pmid] = not translation_state
-            st.rerun()
+        st.button("Translate", key=f"translate_{pmid}_{record['document_title']}", help="Translate the abstract to Korean",
+                  on_click=toggle_translation, args=(record,))
     with col3:
-        if st.button("💖" if favorited else "🤍", key=f"favorite_{pmid}_{record['document_title']}", help="Toggle favorite"):
-            toggle_favorite(member_no, pmid)
-            st.rerun()
+        st.button("💖" if favorited else "🤍", key=f"favorite_{pmid}_{record['document_title']}", help="Toggle favorite",
+                  on_click=toggle_favorite_card, args=(member_no, pmid))
 
 def scrap_service():
+    if "translation_states" not in st.session_state:
+        st.session_state["translation_states"] = {}
+    if "translated_abstracts" not in st.session_state:
+        st.session_state["translated_abstracts"] = {}
+
     st.header("💖 스크랩한 논문들")
 
     member_no = st.session_state.member_no
 
-    papers = fetch_scraped_papers(member_no)
-    keywords = fetch_keywords_from_scraped_papers(papers)
+    keyword_counts = fetch_scraped_keyword_counts(member_no)
+    options = ["전체"] + list(keyword_counts)
+    # 즐겨찾기 해제로 사라진 키워드는 저장된 선택에서 뺀다
+    if "keyword_filter_scrap" in st.session_state:
+        st.session_state["keyword_filter_scrap"] = [k for k in st.session_state["keyword_filter_scrap"] if k in options]
 
     col1, col2 = st.columns([3, 2])
     with col1:
-        selected_keywords = st.multiselect("키워드로 필터링", ["전체"] + list(keywords), key="keyword_filter_scrap")
-    
+        selected_keywords = st.multiselect(
+            "키워드로 필터링",
+            options,
+            format_func=lambda keyword: keyword if keyword == "전체" else f"{keyword} ({keyword_counts[keyword]})",
+            key="keyword_filter_scrap",
+        )
+
+    # "전체"를 고르거나 아무것도 고르지 않으면 필터 없이 가져온다
     if "전체" in selected_keywords:
-        selected_keywords = keywords
+        selected_keywords = []
+
+    papers = fetch_scraped_papers(member_no, selected_keywords)
+
+    if papers and st.button("전체 번역", key="translate_all_scrap", help="Translate every paper on this page to Korean"):
+        translate_visible_papers(papers)
 
-    if selected_keywords:
-        papers = [paper for paper in papers if paper['search_keyword'] in selected_keywords]
+    # fetch_scraped_papers가 즐겨찾기와 조인하므로 목록의 모든 논문은 즐겨찾기 상태이다
+    st.session_state["favorite_pmids"] = {paper['document_pmid'] for paper in papers}
 
-    for idx, paper in enumerate(papers):
-        pmid = paper['document_pmid']
-        translation_state = st.session_state["translation_states"].get(pmid, False)
-        translated_abstract = st.session_state["translated_abstracts"].get(pmid)
-        display_paper(paper, translation_state, translated_abstract)
+    for paper in papers:
+        display_paper(paper)
 
 # Initialize session state variables
 if "translation_states" not in st.session_state:
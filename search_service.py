@@ -1,71 +1,63 @@
 import streamlit as st
-import mysql.connector
 from mysql.connector import Error
-from config import DB_CONFIG, AI_CONFIG
-import deepl
+from connection_pool import create_connection
+from favorite_read_model import add_favorite_paper, remove_favorite_paper
+from translation_service import translate, translate_paper, translate_visible_papers
 import random
 import string
 from datetime import datetime
 
-def create_connection():
-    try:
-        connection = mysql.connector.connect(
-            host=DB_CONFIG["host"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            database=DB_CONFIG["database"],
-            autocommit=DB_CONFIG["autocommit"]
-        )
-        return connection
-    except Error as e:
-        st.error(f"Error connecting to MySQL database: {e}")
-        return None
+PAGE_SIZE = 20
 
-def translate(text: str):
-    try:
-        translator = deepl.Translator(AI_CONFIG["deepl"]["api_key"])
-        translated = translator.translate_text(text, target_lang="KO").text
-        return translated
-    except Exception as e:
-        st.error(f"Translation error: {e}")
-        return text
-
-def save_translation_to_db(pmid, translated_abstract):
+def fetch_count(query, params):
     connection = create_connection()
     if connection:
         try:
             cursor = connection.cursor()
-            query = "UPDATE tb_crawl_data SET crawl_data_abstract_ko = %s WHERE crawl_data_pmid = %s"
-            cursor.execute(query, (translated_abstract, pmid))
-            connection.commit()
+            cursor.execute(query, params)
+            return cursor.fetchone()[0]
         except Error as e:
-            st.error(f"Error saving translation to database: {e}")
+            st.error(f"Error counting data: {e}")
+            return 0
         finally:
             cursor.close()
             connection.close()
+    else:
+        return 0
 
-def fetch_all_papers(member_no):
+def count_papers(member_no):
+    # idx_member_document_listing의 member_no 범위만 센다 (sql/008_add_member_document_listing_index.sql)
+    query = "SELECT COUNT(*) FROM tb_member_document WHERE member_no = %s"
+    return fetch_count(query, (member_no,))
+
+def fetch_papers_page(member_no, after=None, page_size=PAGE_SIZE):
+    # after: 이전 페이지 마지막 행의 (sort_title, document_pmid, search_keyword_no)
+    # WHERE와 ORDER BY가 idx_member_document_listing을 그대로 따라가므로 정렬 없이 LIMIT만큼만 읽는다
     connection = create_connection()
     if connection:
         try:
             cursor = connection.cursor(dictionary=True)
-            query = """
+            keyset = "AND (md.sort_title, md.document_pmid, md.search_keyword_no) > (%s, %s, %s)" if after else ""
+            query = f"""
             SELECT 
                 md.document_title, 
                 md.document_author, 
                 md.document_abstract, 
                 md.document_pmid,
+                md.search_keyword_no,
+                md.sort_title,
                 sk.search_keyword
             FROM 
                 tb_member_document md
             JOIN 
                 tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
             WHERE 
-                sk.member_no = %s
+                md.member_no = %s {keyset}
             ORDER BY 
-                md.document_title
+                md.sort_title, md.document_pmid, md.search_keyword_no
+            LIMIT %s
             """
-            cursor.execute(query, (member_no,))
+            cursor.execute(query, (member_no, *(after or ()), page_size))
             records = cursor.fetchall()
             return records
         except Error as e:
@@ -77,69 +69,61 @@ def fetch_all_papers(member_no):
     else:
         return []
 
-def search_papers(member_no, query, search_scope):
+# 검색 범위별 MATCH 대상 컬럼 (sql/002_add_member_document_fulltext.sql의 인덱스와 일치해야 함)
+SEARCH_SCOPE_COLUMNS = {
+    "제목": "md.document_title",
+    "제목+내용": "md.document_title, md.document_abstract",
+    "저자": "md.document_author",
+}
+
+def count_search_results(member_no, query, search_scope):
+    columns = SEARCH_SCOPE_COLUMNS.get(search_scope)
+    if not columns:
+        return 0
+    count_query = f"""
+    SELECT COUNT(*)
+    FROM tb_member_document md
+    JOIN tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
+    WHERE sk.member_no = %s AND MATCH ({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)
+    """
+    return fetch_count(count_query, (member_no, query))
+
+def search_papers(member_no, query, search_scope, after=None, page_size=PAGE_SIZE):
+    # after: 이전 페이지 마지막 행의 (score, document_pmid, search_keyword_no)
+    columns = SEARCH_SCOPE_COLUMNS.get(search_scope)
+    if not columns:
+        return []
+    match = f"MATCH ({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
     connection = create_connection()
     if connection:
         try:
             cursor = connection.cursor(dictionary=True)
-            if search_scope == "제목":
-                search_query = f"""
-                SELECT 
-                    md.document_title, 
-                    md.document_author, 
-                    md.document_abstract, 
-                    md.document_pmid,
-                    sk.search_keyword
-                FROM 
-                    tb_member_document md
-                JOIN 
-                    tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
-                WHERE 
-                    sk.member_no = %s AND md.document_title LIKE %s
-                ORDER BY 
-                    md.document_title
-                """
-                cursor.execute(search_query, (member_no, f"%{query}%"))
-            elif search_scope == "제목+내용":
-                search_query = f"""
-                SELECT 
-                    md.document_title, 
-                    md.document_author, 
-                    md.document_abstract, 
-                    md.document_pmid,
-                    sk.search_keyword
-                FROM 
-                    tb_member_document md
-                JOIN 
-                    tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
-                WHERE 
-                    sk.member_no = %s AND (
-                        md.document_title LIKE %s OR 
-                        md.document_abstract LIKE %s
-                    )
-                ORDER BY 
-                    md.document_title
-                """
-                cursor.execute(search_query, (member_no, f"%{query}%", f"%{query}%"))
-            elif search_scope == "저자":
-                search_query = f"""
-                SELECT 
-                    md.document_title, 
-                    md.document_author, 
-                    md.document_abstract, 
-                    md.document_pmid,
-                    sk.search_keyword
-                FROM 
-                    tb_member_document md
-                JOIN 
-                    tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
-                WHERE 
-                    sk.member_no = %s AND md.document_author LIKE %s
-                ORDER BY 
-                    md.document_title
-                """
-                cursor.execute(search_query, (member_no, f"%{query}%"))
-            
+            params = [query, member_no, query]
+            keyset = ""
+            if after:
+                score, pmid, search_keyword_no = after
+                keyset = f"AND ({match} < %s OR ({match} = %s AND (md.document_pmid, md.search_keyword_no) > (%s, %s)))"
+                params += [query, score, query, score, pmid, search_keyword_no]
+            search_query = f"""
+            SELECT 
+                md.document_title, 
+                md.document_author, 
+                md.document_abstract, 
+                md.document_pmid,
+                md.search_keyword_no,
+                sk.search_keyword,
+                {match} AS score
+            FROM 
+                tb_member_document md
+            JOIN 
+                tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
+            WHERE 
+                sk.member_no = %s AND {match} {keyset}
+            ORDER BY 
+                score DESC, md.document_pmid, md.search_keyword_no
+            LIMIT %s
+            """
+            cursor.execute(search_query, (*params, page_size))
             records = cursor.fetchall()
             return records
         except Error as e:
@@ -184,8 +168,10 @@ def toggle_favorite(pmid, member_no):
     connection = create_connection()
     try:
         cursor = connection.cursor()
+        # autocommit 설정과 관계없이 즐겨찾기와 읽기 모델을 한 트랜잭션으로 바꾼다
+        connection.start_transaction()
         # Check if the paper is already in the favorite list
-        query = "SELECT COUNT(*) FROM tb_user_favorite WHERE document_pmid = %s AND member_no = %s"
+        query = "SELECT COUNT(*) FROM tb_user_favorite WHERE document_pmid = %s AND member_no = %s FOR UPDATE"
         cursor.execute(query, (pmid, member_no))
         result = cursor.fetchone()
 
@@ -193,6 +179,7 @@ def toggle_favorite(pmid, member_no):
             # If the paper is already in the favorite list, remove it
             delete_query = "DELETE FROM tb_user_favorite WHERE document_pmid = %s AND member_no = %s"
             cursor.execute(delete_query, (pmid, member_no))
+            remove_favorite_paper(cursor, member_no, pmid)
         else:
             # If the paper is not in the favorite list, add it
             favorite_no = generate_no()
@@ -201,8 +188,10 @@ def toggle_favorite(pmid, member_no):
                 VALUES (%s, %s, %s)
             """
             cursor.execute(insert_query, (favorite_no, pmid, member_no))
+            add_favorite_paper(cursor, member_no, pmid)
         connection.commit()
     except Error as e:
+        connection.rollback()
         st.error(f"Error toggling favorite: {e}")
     finally:
         cursor.close()
@@ -223,7 +212,44 @@ def is_favorite(pmid, member_no):
         cursor.close()
         connection.close()
 
-def display_paper(record, translation_state, translated_abstract=None, idx=0):
+def fetch_favorite_pmids(member_no):
+    connection = create_connection()
+    if connection:
+        try:
+            cursor = connection.cursor()
+            query = "SELECT document_pmid FROM tb_user_favorite WHERE member_no = %s"
+            cursor.execute(query, (member_no,))
+            return {row[0] for row in cursor.fetchall()}
+        except Error as e:
+            st.error(f"Error fetching favorites: {e}")
+            return set()
+        finally:
+            cursor.close()
+            connection.close()
+    else:
+        return set()
+
+def toggle_translation(record):
+    pmid = record['document_pmid']
+    translation_state = st.session_state["translation_states"].get(pmid, False)
+    if not translation_state and pmid not in st.session_state["translated_abstracts"]:
+        _, translated_abstract = translate_paper(record)
+        st.session_state["translated_abstracts"][pmid] = translated_abstract
+    st.session_state["translation_states"][pmid] = not translation_state
+
+def toggle_favorite_card(pmid, member_no):
+    toggle_favorite(pmid, member_no)
+    st.session_state["favorite_pmids"] ^= {pmid}
+
+# 카드 단위 fragment: 번역/즐겨찾기 버튼은 앱 전체가 아닌 해당 카드만 다시 그린다
+@st.experimental_fragment
+def display_paper(record, idx=0):
+    pmid = record['document_pmid']
+    member_no = st.session_state.member_no
+    translation_state = st.session_state["translation_states"].get(pmid, False)
+    translated_abstract = st.session_state["translated_abstracts"].get(pmid)
+    favorited = pmid in st.session_state["favorite_pmids"]
+
     if translation_state and translated_abstract:
         title = translate(record['document_title'])
         abstract = translated_abstract
@@ -231,10 +257,6 @@ def display_paper(record, translation_state, translated_abstract=None, idx=0):
         title = record['document_title']
         abstract = record['document_abstract']
 
-    pmid = record['document_pmid']
-    member_no = st.session_state.member_no
-    favorited = is_favorite(pmid, member_no)
-
     st.markdown(
         f"""
         <div style="border: 2px solid #5b5b5b; padding: 10px; border-radius: 10px; margin-bottom: 10px; position: relative;">
@@ -249,17 +271,35 @@ def display_paper(record, translation_state, translated_abstract=None, idx=0):
 
     col1, col2, col3 = st.columns([18.2, 1.8, 1])
     with col2:
-        if st.button("Translate", key=f"translate_{pmid}_{idx}", help="Translate the abstract to Korean"):
-            if not translation_state:
-                translated_abstract = translate(record['document_abstract'])
-                st.session_state["translated_abstracts"][pmid] = translated_abstract
-                save_translation_to_db(pmid, translated_abstract)
-            st.session_state["translation_states"][pmid] = not translation_state
-            st.rerun()
+        st.button("Translate", key=f"translate_{pmid}_{idx}", help="Translate the abstract to Korean",
+                  on_click=toggle_translation, args=(record,))
     with col3:
-        if st.button("💖" if favorited else "🤍", key=f"favorite_{pmid}_{idx}", help="Toggle favorite"):
-            toggle_favorite(pmid, member_no)
-            st.rerun()
+        st.button("💖" if favorited else "🤍", key=f"favorite_{pmid}_{idx}", help="Toggle favorite",
+                  on_click=toggle_favorite_card, args=(pmid, member_no))
+
+def page_cursor(record, search_mode):
+    if search_mode:
+        return (record['score'], record['document_pmid'], record['search_keyword_no'])
+    return (record['sort_title'], record['document_pmid'], record['search_keyword_no'])
+
+def go_to_next_page(cursor):
+    page = st.session_state["page"]
+    del st.session_state["page_cursors"][page:]
+    st.session_state["page_cursors"].append(cursor)
+    st.session_state["page"] = page + 1
+
+def go_to_previous_page():
+    st.session_state["page"] = max(st.session_state["page"] - 1, 1)
+
+def display_page_navigation(page, page_size, total, has_next, next_cursor):
+    total_pages = max((total + page_size - 1) // page_size, 1)
+    col1, col2, col3 = st.columns([1, 8, 1])
+    with col1:
+        st.button("◀ 이전", key="previous_page", disabled=page <= 1, on_click=go_to_previous_page)
+    with col2:
+        st.markdown(f"<p style='text-align: center;'>{page} / {total_pages}</p>", unsafe_allow_html=True)
+    with col3:
+        st.button("다음 ▶", key="next_page", disabled=not has_next, on_click=go_to_next_page, args=(next_cursor,))
 
 def search_service():
     # 세션 상태 초기화
@@ -273,6 +313,8 @@ def search_service():
         st.session_state["translation_states"] = {}
     if "translated_abstracts" not in st.session_state:
         st.session_state["translated_abstracts"] = {}
+    if "page_size" not in st.session_state:
+        st.session_state["page_size"] = PAGE_SIZE
 
     st.header("🔍 논문 검색")
 
@@ -296,6 +338,7 @@ def search_service():
                 st.write(keyword)
     with col2:
         show_all_button = st.button("모든 논문 보기", key="show_all")
+        page_size = st.selectbox("페이지당 논문 수", [10, 20, 50], key="page_size")
 
     if show_all_button:
         st.session_state["search_mode"] = False
@@ -305,25 +348,44 @@ def search_service():
         st.session_state["search_query"] = search_query
         st.session_state["search_scope"] = search_scope
 
-    if st.session_state["search_mode"]:
-        search_query = st.session_state.get("search_query", "")
-        search_scope = st.session_state.get("search_scope", "제목")
-        results = search_papers(member_no, search_query, search_scope)
-        st.write(f"총 {len(results)}개의 검색 결과가 있습니다.")
-        for idx, record in enumerate(results):
-            pmid = record['document_pmid']
-            translation_state = st.session_state["translation_states"].get(pmid, False)
-            translated_abstract = st.session_state["translated_abstracts"].get(pmid)
-            display_paper(record, translation_state, translated_abstract, idx)
+    # 카드마다 조회하지 않도록 즐겨찾기 목록은 한 번만 가져온다
+    st.session_state["favorite_pmids"] = fetch_favorite_pmids(member_no)
+
+    search_mode = st.session_state["search_mode"]
+    search_query = st.session_state.get("search_query", "")
+    search_scope = st.session_state.get("search_scope", "제목")
+
+    # 목록 조건이 바뀌면 첫 페이지부터 다시 시작한다
+    listing_key = (search_mode, search_query, search_scope, page_size) if search_mode else (search_mode, page_size)
+    if st.session_state.get("listing_key") != listing_key:
+        st.session_state["listing_key"] = listing_key
+        st.session_state["page"] = 1
+        st.session_state["page_cursors"] = [None]
+
+    page = st.session_state["page"]
+    after = st.session_state["page_cursors"][page - 1]
+
+    if search_mode:
+        total = count_search_results(member_no, search_query, search_scope)
+        records = search_papers(member_no, search_query, search_scope, after, page_size + 1)
+        st.write(f"총 {total}개의 검색 결과가 있습니다.")
     else:
         st.write("#### 모든 논문 목록")
-        papers = fetch_all_papers(member_no)
+        total = count_papers(member_no)
+        records = fetch_papers_page(member_no, after, page_size + 1)
+
+    has_next = len(records) > page_size
+    records = records[:page_size]
+
+    if records and st.button("전체 번역", key="translate_all_papers", help="Translate every paper on this page to Korean"):
+        translate_visible_papers(records)
+
+    for idx, record in enumerate(records):
+        display_paper(record, idx)
 
-        for idx, paper in enumerate(papers):
-            pmid = paper['document_pmid']
-            translation_state = st.session_state["translation_states"].get(pmid, False)
-            translated_abstract = st.session_state["translated_abstracts"].get(pmid)
-            display_paper(paper, translation_state, translated_abstract, idx)
+    if records:
+        next_cursor = page_cursor(records[-1], search_mode)
+        display_page_navigation(page, page_size, total, has_next, next_cursor)
 
 # Initialize session state variables
 if "translation_states" not in st.session_state:
@@ -0,0 +1,3 @@
+-- 번역된 제목을 원문 초록 번역과 함께 저장한다
+ALTER TABLE tb_crawl_data
+    ADD COLUMN crawl_data_title_ko TEXT NULL AFTER crawl_data_abstract_ko;
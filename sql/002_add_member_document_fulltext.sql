@@ -0,0 +1,6 @@
+-- search_service.search_papers의 검색 범위(제목 / 제목+내용 / 저자)별 전문 검색 인덱스
+-- 한국어 검색어도 매칭되도록 ngram 파서를 사용한다
+ALTER TABLE tb_member_document
+    ADD FULLTEXT INDEX ft_member_document_title (document_title) WITH PARSER ngram,
+    ADD FULLTEXT INDEX ft_member_document_title_abstract (document_title, document_abstract) WITH PARSER ngram,
+    ADD FULLTEXT INDEX ft_member_document_author (document_author) WITH PARSER ngram;
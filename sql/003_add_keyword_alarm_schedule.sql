@@ -0,0 +1,13 @@
+-- 알림 키워드별 크롤링 시각과 옵션
+ALTER TABLE tb_search_keyword
+    ADD COLUMN alarm_hour TINYINT NULL,
+    ADD COLUMN alarm_minute TINYINT NULL,
+    ADD COLUMN crawling_option VARCHAR(20) NULL;
+
+-- 회원과 무관하게 (키워드, 옵션)별 마지막 스케줄 실행 시각을 기록한다
+CREATE TABLE IF NOT EXISTS tb_keyword_crawl_run (
+    search_keyword VARCHAR(255) NOT NULL,
+    crawling_option VARCHAR(20) NOT NULL,
+    last_run_at DATETIME NOT NULL,
+    PRIMARY KEY (search_keyword, crawling_option)
+);
@@ -0,0 +1,12 @@
+-- (회원, 키워드)별로 마지막으로 메일에 포함한 문서 위치를 기록한다
+CREATE TABLE IF NOT EXISTS tb_mailing_watermark (
+    member_no VARCHAR(32) NOT NULL,
+    search_keyword_no VARCHAR(32) NOT NULL,
+    last_insert_date DATETIME NOT NULL,
+    last_pmid VARCHAR(32) NOT NULL,
+    PRIMARY KEY (member_no, search_keyword_no)
+);
+
+-- 워터마크 이후의 새 문서만 범위로 읽기 위한 인덱스
+ALTER TABLE tb_member_document
+    ADD INDEX idx_member_document_keyword_insert (search_keyword_no, insert_date, document_pmid);
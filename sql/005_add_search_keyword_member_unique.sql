@@ -0,0 +1,5 @@
+-- 회원별 키워드는 한 행만 두어 알림 설정을 INSERT ... ON DUPLICATE KEY UPDATE 한 문장으로 처리한다
+-- 적용 전에 중복 행이 없는지 확인한다:
+--   SELECT member_no, search_keyword, COUNT(*) FROM tb_search_keyword GROUP BY member_no, search_keyword HAVING COUNT(*) > 1;
+ALTER TABLE tb_search_keyword
+    ADD UNIQUE KEY uk_search_keyword_member (member_no, search_keyword);
@@ -0,0 +1,44 @@
+-- 스크랩 탭용 읽기 모델: 회원별 즐겨찾기 논문 한 행에 키워드를 콤마로 모아 둔다
+CREATE TABLE IF NOT EXISTS tb_member_favorite_paper (
+    member_no VARCHAR(32) NOT NULL,
+    document_pmid VARCHAR(32) NOT NULL,
+    document_title TEXT,
+    sort_title VARCHAR(191) NOT NULL DEFAULT '',
+    document_author TEXT,
+    document_abstract MEDIUMTEXT,
+    search_keywords TEXT,
+    favorited_at DATETIME NOT NULL,
+    PRIMARY KEY (member_no, document_pmid),
+    KEY idx_member_favorite_paper_title (member_no, sort_title, document_pmid),
+    KEY idx_member_favorite_paper_pmid (document_pmid)
+);
+
+-- 기존 즐겨찾기 채우기
+INSERT IGNORE INTO tb_member_favorite_paper
+    (member_no, document_pmid, document_title, sort_title, document_author, document_abstract, search_keywords, favorited_at)
+SELECT
+    uf.member_no,
+    md.document_pmid,
+    MAX(md.document_title),
+    LEFT(MAX(md.document_title), 191),
+    MAX(md.document_author),
+    MAX(md.document_abstract),
+    GROUP_CONCAT(DISTINCT sk.search_keyword ORDER BY sk.search_keyword SEPARATOR ','),
+    NOW()
+FROM tb_user_favorite uf
+JOIN tb_member_document md ON md.document_pmid = uf.document_pmid
+JOIN tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
+GROUP BY uf.member_no, md.document_pmid;
+
+-- 크롤러가 이미 즐겨찾기된 논문을 다른 키워드로 다시 넣으면 키워드 목록을 갱신한다
+CREATE TRIGGER trg_member_document_favorite_keywords
+AFTER INSERT ON tb_member_document
+FOR EACH ROW
+    UPDATE tb_member_favorite_paper fp
+    SET fp.search_keywords = (
+        SELECT GROUP_CONCAT(DISTINCT sk.search_keyword ORDER BY sk.search_keyword SEPARATOR ',')
+        FROM tb_member_document md
+        JOIN tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
+        WHERE md.document_pmid = NEW.document_pmid
+    )
+    WHERE fp.document_pmid = NEW.document_pmid;
@@ -0,0 +1,29 @@
+-- 즐겨찾기 키워드를 (회원, 키워드, 논문) 한 행씩 두어 키워드 필터와 키워드별 개수를 인덱스로 처리한다
+-- (콤마로 모은 search_keywords는 FIND_IN_SET 전체 스캔이 필요하고 GROUP_CONCAT 길이 제한에서 잘린다)
+CREATE TABLE IF NOT EXISTS tb_member_favorite_keyword (
+    member_no VARCHAR(32) NOT NULL,
+    search_keyword VARCHAR(255) NOT NULL,
+    document_pmid VARCHAR(32) NOT NULL,
+    PRIMARY KEY (member_no, search_keyword, document_pmid),
+    KEY idx_member_favorite_keyword_member_pmid (member_no, document_pmid)
+);
+
+-- 기존 즐겨찾기 채우기
+INSERT IGNORE INTO tb_member_favorite_keyword (member_no, search_keyword, document_pmid)
+SELECT DISTINCT fp.member_no, sk.search_keyword, md.document_pmid
+FROM tb_member_favorite_paper fp
+JOIN tb_member_document md ON md.document_pmid = fp.document_pmid
+JOIN tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no;
+
+-- 크롤러가 이미 즐겨찾기된 논문을 다른 키워드로 다시 넣으면 그 키워드 행을 추가한다
+DROP TRIGGER IF EXISTS trg_member_document_favorite_keywords;
+CREATE TRIGGER trg_member_document_favorite_keywords
+AFTER INSERT ON tb_member_document
+FOR EACH ROW
+    INSERT IGNORE INTO tb_member_favorite_keyword (member_no, search_keyword, document_pmid)
+    SELECT fp.member_no, sk.search_keyword, NEW.document_pmid
+    FROM tb_member_favorite_paper fp
+    JOIN tb_search_keyword sk ON sk.search_keyword_no = NEW.search_keyword_no
+    WHERE fp.document_pmid = NEW.document_pmid;
+
+ALTER TABLE tb_member_favorite_paper DROP COLUMN search_keywords;
@@ -0,0 +1,28 @@
+-- 논문 목록 키셋 페이지네이션용 컬럼과 인덱스
+-- member_no로 회원을 바로 거르고 (sort_title, document_pmid, search_keyword_no) 순서를 인덱스에서 읽어
+-- 정렬 없이 LIMIT만큼만 읽고, 전체 개수도 인덱스 범위만 센다
+ALTER TABLE tb_member_document
+    ADD COLUMN member_no VARCHAR(32) NULL,
+    ADD COLUMN sort_title VARCHAR(191) NOT NULL DEFAULT '';
+
+UPDATE tb_member_document md
+JOIN tb_search_keyword sk ON md.search_keyword_no = sk.search_keyword_no
+SET md.member_no = sk.member_no,
+    md.sort_title = LEFT(COALESCE(md.document_title, ''), 191);
+
+ALTER TABLE tb_member_document
+    ADD INDEX idx_member_document_listing (member_no, sort_title, document_pmid, search_keyword_no);
+
+-- tb_member_document는 크롤러가 채우므로 두 컬럼은 트리거로 맞춘다
+DROP TRIGGER IF EXISTS trg_member_document_listing_insert;
+CREATE TRIGGER trg_member_document_listing_insert
+BEFORE INSERT ON tb_member_document
+FOR EACH ROW
+    SET NEW.member_no = (SELECT sk.member_no FROM tb_search_keyword sk WHERE sk.search_keyword_no = NEW.search_keyword_no),
+        NEW.sort_title = LEFT(COALESCE(NEW.document_title, ''), 191);
+
+DROP TRIGGER IF EXISTS trg_member_document_listing_update;
+CREATE TRIGGER trg_member_document_listing_update
+BEFORE UPDATE ON tb_member_document
+FOR EACH ROW
+    SET NEW.sort_title = LEFT(COALESCE(NEW.document_title, ''), 191);
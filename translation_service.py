@@ -0,0 +1,280 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import streamlit as st
+import deepl
+from mysql.connector import Error
+from config import AI_CONFIG
+from connection_pool import create_connection
+from mysql_connector_pool import MysqlConnectorPool
+
+
+class TranslationCache:
+    # 프로세스 전체에서 공유하는 LRU 캐시 (key: (본문 해시, 대상 언어))
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, target_lang):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest(), target_lang
+
+    def get(self, text, target_lang):
+        # 초록이 없는 논문(NULL)은 번역할 내용이 없으므로 그대로 돌려준다
+        if not text:
+            return text
+        key = self.make_key(text, target_lang)
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, text, target_lang, translated):
+        if not text:
+            return
+        key = self.make_key(text, target_lang)
+        with self._lock:
+            self._items[key] = translated
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+@st.cache_resource
+def get_translator():
+    return deepl.Translator(AI_CONFIG["deepl"]["api_key"])
+
+
+@st.cache_resource
+def get_translation_cache():
+    return TranslationCache(AI_CONFIG["deepl"].get("cache_size", 4096))
+
+
+def translate(text: str, target_lang="KO"):
+    if not text:
+        return text
+    cache = get_translation_cache()
+    cached = cache.get(text, target_lang)
+    if cached is not None:
+        return cached
+    try:
+        translated = get_translator().translate_text(text, target_lang=target_lang).text
+        cache.put(text, target_lang, translated)
+        return translated
+    except Exception as e:
+        st.error(f"Translation error: {e}")
+        return text
+
+
+def fetch_saved_translation(pmid):
+    connection = create_connection()
+    if connection:
+        try:
+            cursor = connection.cursor(dictionary=True)
+            query = """
+            SELECT crawl_data_title_ko, crawl_data_abstract_ko
+            FROM tb_crawl_data
+            WHERE crawl_data_pmid = %s
+            """
+            cursor.execute(query, (pmid,))
+            return cursor.fetchone()
+        except Error as e:
+            st.error(f"Error fetching translation: {e}")
+            return None
+        finally:
+            cursor.close()
+            connection.close()
+    else:
+        return None
+
+
+def save_translation_to_db(pmid, translated_abstract, translated_title=None):
+    connection = create_connection()
+    if connection:
+        try:
+            cursor = connection.cursor()
+            query = """
+            UPDATE tb_crawl_data
+            SET crawl_data_abstract_ko = %s,
+                crawl_data_title_ko = COALESCE(%s, crawl_data_title_ko)
+            WHERE crawl_data_pmid = %s
+            """
+            cursor.execute(query, (translated_abstract, translated_title, pmid))
+            connection.commit()
+        except Error as e:
+            st.error(f"Error saving translation to database: {e}")
+        finally:
+            cursor.close()
+            connection.close()
+
+
+def translate_paper(record, target_lang="KO"):
+    # 메모리 캐시 -> DB에 저장된 번역 -> DeepL 순으로 조회한다
+    title = record['document_title']
+    abstract = record['document_abstract']
+    cache = get_translation_cache()
+    title_ko = cache.get(title, target_lang)
+    abstract_ko = cache.get(abstract, target_lang)
+    if (title_ko or not title) and (abstract_ko or not abstract):
+        return title_ko, abstract_ko
+
+    saved = fetch_saved_translation(record['document_pmid']) or {}
+    if title_ko is None and saved.get('crawl_data_title_ko'):
+        title_ko = saved['crawl_data_title_ko']
+        cache.put(title, target_lang, title_ko)
+    if abstract_ko is None and saved.get('crawl_data_abstract_ko'):
+        abstract_ko = saved['crawl_data_abstract_ko']
+        cache.put(abstract, target_lang, abstract_ko)
+
+    if title_ko is None or abstract_ko is None:
+        title_ko = title_ko if title_ko is not None else translate(title, target_lang)
+        abstract_ko = abstract_ko if abstract_ko is not None else translate(abstract, target_lang)
+        # 번역 실패 시 translate()는 원문을 돌려주므로 저장하지 않는다
+        if abstract_ko != abstract or (not abstract and title_ko != title):
+            save_translation_to_db(record['document_pmid'], abstract_ko, title_ko if title_ko != title else None)
+    return title_ko, abstract_ko
+
+
+def translate_many(texts, target_lang="KO", on_progress=None):
+    # 캐시에 없는 본문만 모아 여러 건씩 한 번에 요청하고, 요청은 소수의 스레드로 병렬 처리한다
+    cache = get_translation_cache()
+    results = {}
+    pending = []
+    for text in texts:
+        if not text or text in results:
+            continue
+        cached = cache.get(text, target_lang)
+        if cached is not None:
+            results[text] = cached
+        elif text not in pending:
+            pending.append(text)
+
+    batch_size = AI_CONFIG["deepl"].get("batch_size", 50)
+    max_workers = AI_CONFIG["deepl"].get("max_workers", 4)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    if batches:
+        translator = get_translator()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(translator.translate_text, batch, target_lang=target_lang): batch for batch in batches}
+            for done, future in enumerate(as_completed(futures), start=1):
+                batch = futures[future]
+                try:
+                    for text, translated in zip(batch, future.result()):
+                        cache.put(text, target_lang, translated.text)
+                        results[text] = translated.text
+                except Exception as e:
+                    st.error(f"Translation error: {e}")
+                if on_progress:
+                    on_progress(done, len(batches))
+    return [results.get(text, text) for text in texts]
+
+
+def fetch_saved_translations(pmids):
+    if not pmids:
+        return {}
+    connection = create_connection()
+    if connection:
+        try:
+            cursor = connection.cursor(dictionary=True)
+            placeholders = ", ".join(["%s"] * len(pmids))
+            query = f"""
+            SELECT crawl_data_pmid, crawl_data_title_ko, crawl_data_abstract_ko
+            FROM tb_crawl_data
+            WHERE crawl_data_pmid IN ({placeholders})
+            """
+            cursor.execute(query, tuple(pmids))
+            return {row['crawl_data_pmid']: row for row in cursor.fetchall()}
+        except Error as e:
+            st.error(f"Error fetching translations: {e}")
+            return {}
+        finally:
+            cursor.close()
+            connection.close()
+    else:
+        return {}
+
+
+def save_translations_to_db(rows):
+    # rows: [(pmid, translated_title, translated_abstract), ...] (None인 쪽은 기존 값을 유지한다)
+    if not rows:
+        return
+    query = """
+    UPDATE tb_crawl_data
+    SET crawl_data_abstract_ko = COALESCE(%s, crawl_data_abstract_ko),
+        crawl_data_title_ko = COALESCE(%s, crawl_data_title_ko)
+    WHERE crawl_data_pmid = %s
+    """
+    try:
+        MysqlConnectorPool.instance().write_many(query, [(abstract_ko, title_ko, pmid) for pmid, title_ko, abstract_ko in rows])
+    except Error as e:
+        st.error(f"Error saving translations to database: {e}")
+
+
+def translate_papers(records, target_lang="KO", on_progress=None):
+    # 여러 논문을 한 번에 번역한다. 반환값: {pmid: (번역 제목, 번역 초록)}
+    papers = {}
+    for record in records:
+        papers.setdefault(record['document_pmid'], record)
+
+    cache = get_translation_cache()
+    translations = {}
+    partial = {}
+    for pmid, record in papers.items():
+        title_ko = cache.get(record['document_title'], target_lang)
+        abstract_ko = cache.get(record['document_abstract'], target_lang)
+        if (title_ko or not record['document_title']) and (abstract_ko or not record['document_abstract']):
+            translations[pmid] = (title_ko, abstract_ko)
+        else:
+            partial[pmid] = [title_ko, abstract_ko]
+
+    # 제목 컬럼이 생기기 전에 저장된 번역은 초록만 있으므로, 저장된 쪽은 그대로 쓰고 없는 쪽만 번역한다
+    saved = fetch_saved_translations(list(partial))
+    for pmid, halves in partial.items():
+        record = papers[pmid]
+        row = saved.get(pmid) or {}
+        if halves[0] is None and row.get('crawl_data_title_ko'):
+            halves[0] = row['crawl_data_title_ko']
+            cache.put(record['document_title'], target_lang, halves[0])
+        if halves[1] is None and row.get('crawl_data_abstract_ko'):
+            halves[1] = row['crawl_data_abstract_ko']
+            cache.put(record['document_abstract'], target_lang, halves[1])
+
+    texts = []
+    for pmid, halves in partial.items():
+        for text, translated_text in zip((papers[pmid]['document_title'], papers[pmid]['document_abstract']), halves):
+            if translated_text is None and text:
+                texts.append(text)
+    translated = dict(zip(texts, translate_many(texts, target_lang, on_progress)))
+
+    rows = []
+    for pmid, (title_ko, abstract_ko) in partial.items():
+        title = papers[pmid]['document_title']
+        abstract = papers[pmid]['document_abstract']
+        # 번역 실패 시 translate_many는 원문을 돌려주므로 새로 번역된 쪽만 저장한다
+        new_title = translated.get(title) if title_ko is None and translated.get(title) != title else None
+        new_abstract = translated.get(abstract) if abstract_ko is None and translated.get(abstract) != abstract else None
+        translations[pmid] = (
+            title_ko if title_ko is not None else translated.get(title, title),
+            abstract_ko if abstract_ko is not None else translated.get(abstract, abstract),
+        )
+        if new_title or new_abstract:
+            rows.append((pmid, new_title, new_abstract))
+    save_translations_to_db(rows)
+    return translations
+
+
+def translate_visible_papers(records):
+    # 화면에 보이는 논문을 일괄 번역하고 카드의 번역 상태를 켠다
+    progress = st.progress(0.0, text="번역 중...")
+
+    def on_progress(done, total):
+        progress.progress(done / total, text=f"번역 중... ({done}/{total})")
+
+    translations = translate_papers(records, on_progress=on_progress)
+    for pmid, (_, abstract_ko) in translations.items():
+        st.session_state["translated_abstracts"][pmid] = abstract_ko
+        st.session_state["translation_states"][pmid] = True
+    progress.empty()
@@ -0,0 +1,229 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import repeat
+import chromadb
+from pypdf import PdfReader
+import streamlit as st
+from langchain.document_loaders import PyPDFLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.embeddings import OpenAIEmbeddings, CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain.vectorstores import Chroma
+from langchain.embeddings.base import Embeddings
+from sklearn.feature_extraction.text import HashingVectorizer
+from config import AI_CONFIG
+
+CACHE_DIR = AI_CONFIG.get("cache_dir", ".cache")
+PDF_DIR = os.path.join(CACHE_DIR, "pdfs")
+EMBEDDING_CACHE_DIR = os.path.join(CACHE_DIR, "embeddings")
+VECTOR_STORE_DIR = os.path.join(CACHE_DIR, "chroma")
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# "openai" 또는 네트워크 없이 CPU에서 동작하는 "local" (해싱 벡터라이저)
+EMBEDDING_CONFIG = AI_CONFIG.get("embedding", {})
+EMBEDDING_BACKEND = EMBEDDING_CONFIG.get("backend", "openai")
+EMBEDDING_BATCH_SIZE = AI_CONFIG.get("embedding_batch_size", 64)
+EMBEDDING_MAX_WORKERS = AI_CONFIG.get("embedding_max_workers", 4)
+EMBEDDING_MAX_RETRIES = 3
+
+
+def document_hash(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+
+def save_pdf(data: bytes, doc_hash):
+    # 같은 내용의 PDF는 한 번만 저장한다
+    os.makedirs(PDF_DIR, exist_ok=True)
+    file_path = os.path.join(PDF_DIR, f"{doc_hash}.pdf")
+    if not os.path.exists(file_path):
+        with open(file_path, "wb") as file:
+            file.write(data)
+    return file_path
+
+
+def hash_embed_batch(texts, n_features):
+    # 프로세스 풀에서 실행되므로 모듈 최상위 함수로 둔다
+    vectorizer = HashingVectorizer(n_features=n_features, analyzer="char_wb", ngram_range=(2, 4), alternate_sign=False, norm="l2")
+    return vectorizer.transform(texts).toarray().tolist()
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool(max_workers=None):
+    # 색인 스레드에서도 호출되므로 st.cache_resource 대신 모듈 전역으로 한 번만 만든다
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # 여러 스레드가 도는 서버 프로세스를 fork하면 잠긴 락이 복사될 수 있으므로 forkserver(없으면 spawn)로 워커를 띄운다
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _process_pool
+
+
+class LocalHashingEmbeddings(Embeddings):
+    # 학습이 필요 없는 해싱 벡터라이저 임베딩. 청크 배치를 모든 코어에 나눠 계산한다
+    def __init__(self, n_features=1024, batch_size=256, max_workers=None, min_batch_size=8):
+        self.n_features = n_features
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.min_batch_size = min_batch_size
+
+    def embed_documents(self, texts):
+        # 색인 파이프라인은 작은 배치(EMBEDDING_BATCH_SIZE)로 호출하므로, 들어온 배치를 코어 수만큼 다시 나눈다
+        workers = self.max_workers or os.cpu_count() or 1
+        size = min(self.batch_size, max(self.min_batch_size, -(-len(texts) // workers)))
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        if len(batches) <= 1:
+            return hash_embed_batch(texts, self.n_features) if texts else []
+        results = get_process_pool(self.max_workers).map(hash_embed_batch, batches, repeat(self.n_features))
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text):
+        return hash_embed_batch([text], self.n_features)[0]
+
+
+@st.cache_resource
+def get_embedding_model():
+    if EMBEDDING_BACKEND == "local":
+        return LocalHashingEmbeddings(
+            n_features=EMBEDDING_CONFIG.get("n_features", 1024),
+            batch_size=EMBEDDING_CONFIG.get("batch_size", 256),
+            max_workers=EMBEDDING_CONFIG.get("max_workers"),
+            min_batch_size=EMBEDDING_CONFIG.get("min_batch_size", 8),
+        )
+
+    # 청크 내용 해시 + 임베딩 모델 이름을 키로 디스크에 임베딩을 캐시한다
+    underlying = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=AI_CONFIG["openai"]["api_key"])
+    store = LocalFileStore(EMBEDDING_CACHE_DIR)
+    return CacheBackedEmbeddings.from_bytes_store(underlying, store, namespace=EMBEDDING_MODEL)
+
+
+@st.cache_resource
+def get_chroma_client():
+    return chromadb.PersistentClient(path=VECTOR_STORE_DIR)
+
+
+def get_vectorstore(doc_hash):
+    # 문서 해시마다 하나의 영구 컬렉션을 사용하므로 다른 회원이 올린 같은 논문도 재사용된다
+    # 임베딩 백엔드가 다르면 벡터가 호환되지 않으므로 컬렉션도 분리한다
+    collection_name = f"pdf-{doc_hash[:56]}" if EMBEDDING_BACKEND == "openai" else f"pdf-{EMBEDDING_BACKEND}-{doc_hash[:48]}"
+    return Chroma(
+        client=get_chroma_client(),
+        collection_name=collection_name,
+        embedding_function=get_embedding_model(),
+    )
+
+
+def is_indexed(vectorstore):
+    # 색인이 끝까지 완료된 컬렉션만 재사용한다 (중간에 멈춘 컬렉션은 다시 색인)
+    metadata = vectorstore._collection.metadata or {}
+    return metadata.get("ingestion") == "complete"
+
+
+class IngestionJob:
+    def __init__(self, doc_hash, file_path):
+        self.doc_hash = doc_hash
+        self.file_path = file_path
+        self.status = "running"
+        self.error = None
+        self.total_pages = 0
+        self.pages_read = 0
+        self.chunks_submitted = 0
+        self.chunks_indexed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def progress(self):
+        if not self.total_pages:
+            return 0.0
+        read_ratio = self.pages_read / self.total_pages
+        indexed_ratio = self.chunks_indexed / self.chunks_submitted if self.chunks_submitted else 0.0
+        return min(read_ratio * indexed_ratio, 1.0)
+
+
+@st.cache_resource
+def get_ingestion_jobs():
+    return {}
+
+
+def get_ingestion_job(doc_hash):
+    return get_ingestion_jobs().get(doc_hash)
+
+
+def embed_with_retry(embedding_model, texts):
+    for attempt in range(EMBEDDING_MAX_RETRIES):
+        try:
+            return embedding_model.embed_documents(texts)
+        except Exception:
+            if attempt == EMBEDDING_MAX_RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+
+def index_batch(job, vectorstore, embedding_model, batch):
+    ids = [chunk_id for chunk_id, _ in batch]
+    documents = [chunk for _, chunk in batch]
+    embeddings = embed_with_retry(embedding_model, [chunk.page_content for chunk in documents])
+    with job._lock:
+        vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=[chunk.page_content for chunk in documents],
+            metadatas=[chunk.metadata or None for chunk in documents],
+        )
+        job.chunks_indexed += len(batch)
+
+
+def run_ingestion(job, vectorstore):
+    # 페이지를 읽는 대로 청크로 나누고, 임베딩 배치를 제한된 병렬도로 보내 완료되는 대로 저장한다
+    embedding_model = vectorstore.embeddings
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=0)
+    try:
+        job.total_pages = len(PdfReader(job.file_path).pages)
+        loader = PyPDFLoader(job.file_path)
+        with ThreadPoolExecutor(max_workers=EMBEDDING_MAX_WORKERS) as executor:
+            pending = set()
+            batch = []
+            for page in loader.lazy_load():
+                for chunk in text_splitter.split_documents([page]):
+                    batch.append((f"{job.doc_hash}-{job.chunks_submitted}", chunk))
+                    job.chunks_submitted += 1
+                    if len(batch) >= EMBEDDING_BATCH_SIZE:
+                        pending.add(executor.submit(index_batch, job, vectorstore, embedding_model, batch))
+                        batch = []
+                    if len(pending) >= EMBEDDING_MAX_WORKERS * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                job.pages_read += 1
+            if batch:
+                pending.add(executor.submit(index_batch, job, vectorstore, embedding_model, batch))
+            for future in pending:
+                future.result()
+        vectorstore._collection.modify(metadata={"ingestion": "complete"})
+        job.status = "done"
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+
+
+def start_ingestion(file_path, doc_hash):
+    # 백그라운드에서 색인을 시작하고 즉시 벡터스토어를 돌려준다 (색인된 부분부터 질문 가능)
+    vectorstore = get_vectorstore(doc_hash)
+    jobs = get_ingestion_jobs()
+    job = jobs.get(doc_hash)
+    if is_indexed(vectorstore) or (job and job.status == "running"):
+        return vectorstore
+
+    job = IngestionJob(doc_hash, file_path)
+    jobs[doc_hash] = job
+    threading.Thread(target=run_ingestion, args=(job, vectorstore), daemon=True).start()
+    return vectorstore